@@ -0,0 +1,78 @@
+import os
+import sys
+import math
+from database.db import connect, migrate, rebuild_candidate_stats
+
+# /admin/analytics reads candidate_stats, which triggers keep in step with
+# the candidates table, so the page costs the same at any number of rows.
+
+def summary(conn):
+    rows = conn.execute("SELECT selected, SUM(n), SUM(quiz_sum), SUM(resume_sum) FROM candidate_stats GROUP BY selected").fetchall()
+    counts = {selected: n for selected, n, _, _ in rows}
+    total = sum(counts.values())
+    quiz_sum = sum(q for _, _, q, _ in rows)
+    resume_sum = sum(r for _, _, _, r in rows)
+    return {
+        'total': total,
+        'selected': counts.get(1, 0),
+        'pending': counts.get(0, 0),
+        'rejected': counts.get(2, 0),
+        'avg_quiz': round(quiz_sum / total if total else 0, 1),
+        'avg_resume': round(resume_sum / total if total else 0, 1),
+    }
+
+def job_breakdown(conn, jobs):
+    # Candidates clearing each job's quiz and resume thresholds. Buckets are
+    # whole points, so whole-number thresholds are exact; fractional ones are
+    # rounded up.
+    breakdown = []
+    for job in jobs:
+        min_quiz = math.ceil(job[4] or 0)
+        min_resume = math.ceil(job[5] or 0)
+        eligible, approved, quiz_sum, resume_sum = conn.execute(
+            "SELECT COALESCE(SUM(n), 0), COALESCE(SUM(CASE WHEN selected = 1 THEN n END), 0), SUM(quiz_sum), SUM(resume_sum) "
+            "FROM candidate_stats WHERE quiz_bucket >= ? AND resume_bucket >= ?", (min_quiz, min_resume)).fetchone()
+        breakdown.append({
+            'id': job[0], 'title': job[1], 'min_quiz': job[4], 'min_resume': job[5],
+            'eligible': eligible, 'approved': approved,
+            'avg_quiz': round(quiz_sum / eligible, 1) if eligible else 0,
+            'avg_resume': round(resume_sum / eligible, 1) if eligible else 0,
+        })
+    return breakdown
+
+def check(conn):
+    # Compares the maintained table with a fresh aggregate; returns the
+    # differing cells as (key, stored, actual)
+    stored = {row[:3]: row[3:] for row in conn.execute(
+        "SELECT selected, quiz_bucket, resume_bucket, n, quiz_sum, resume_sum FROM candidate_stats WHERE n != 0")}
+    actual = {row[:3]: row[3:] for row in conn.execute(
+        "SELECT COALESCE(selected, 0), CAST(COALESCE(quiz, 0) AS INTEGER), CAST(COALESCE(resume_score, 0) AS INTEGER), "
+        "COUNT(*), SUM(COALESCE(quiz, 0)), SUM(COALESCE(resume_score, 0)) FROM candidates GROUP BY 1, 2, 3")}
+    diffs = []
+    for key in set(stored) | set(actual):
+        a, b = stored.get(key), actual.get(key)
+        if a is None or b is None or a[0] != b[0] or abs(a[1] - b[1]) > 1e-6 or abs(a[2] - b[2]) > 1e-6:
+            diffs.append((key, a, b))
+    return diffs
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Check or rebuild the candidate_stats aggregates")
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'candidates.db'))
+    parser.add_argument('--rebuild', action='store_true', help="recompute the table from candidates")
+    args = parser.parse_args(argv)
+
+    migrate(args.db)
+    conn = connect(args.db)
+    if args.rebuild:
+        rebuild_candidate_stats(conn)
+        conn.commit()
+        print("candidate_stats rebuilt")
+    diffs = check(conn)
+    for key, stored, actual in diffs[:20]:
+        print(f"  {key}: stored {stored}, actual {actual}")
+    print(f"{len(diffs)} cells differ from the candidates table")
+    return 1 if diffs else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
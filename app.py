@@ -1,88 +1,161 @@
+import startup
+import metrics
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response
 import sqlite3
-import joblib
-import pandas as pd
 import os
-import requests
 import re
-from ml.resume_parser import extract_skills, extract_resume_text, match_resume
-from ml.skill_gap import skill_gap
-from generate_graph import generate_ranking_graph
+import time
+from ml.resume_parser import ingest_resume, ALL_SKILLS, get_skill_matcher, get_pdfplumber
+from ml.job_index import score_resume_against_jobs, on_job_added, get_job_index
+from ml.skill_catalog import get_skill_catalog, invalidate_skill_catalog
+from ml.job_matching import match_jobs
+from ml.candidate_matches import score_candidate, score_new_job, rebuild as rebuild_matches
+from ml.predictor import Predictor, rescore_pending
+from graph_cache import GraphCache
+from generate_graph import load_pyplot
+from task_queue import TaskQueue, FINISHED
+from ollama_client import OllamaClient, OllamaError, OllamaTimeout
+from llm_cache import LLMCache
+from quiz_bank import QuestionBank, parse_questions
+from ml.ranking import get_ranking_engine
+from ml.candidate_index import top_candidates, update_candidate_index, get_candidate_index, MAX_K
+import database.db
+from database.db import connect, migrate, close_all
+from candidate_query import parse_filters, parse_sort, candidate_page, status_counts, candidate_json, DEFAULT_PAGE_SIZE
+from analytics import summary, job_breakdown
+from export import parse_columns, iter_chunks, csv_stream, parquet_stream, gzip_stream, parquet_available
+
+# spaCy, scikit-learn, matplotlib and the model are not imported above; each
+# is loaded on first use, or up front by preload()
+startup.record('app imports', time.perf_counter() - startup.STARTED_AT)
+setup_started = time.perf_counter()
 
 app = Flask(__name__)
 app.secret_key = "secret_candidate_key"
+
+# Every request and SQLite statement is timed into the histograms served at
+# /admin/metrics (off with METRICS=0)
+if metrics.ENABLED:
+    database.db.query_observer = metrics.observe_query
+
+@app.before_request
+def start_request_metrics():
+    metrics.start_request()
+
+@app.after_request
+def finish_request_metrics(response):
+    metrics.finish_request(request.method, request.url_rule.rule if request.url_rule else 'unmatched', response.status_code)
+    return response
 os.makedirs('uploads', exist_ok=True)
 
 # Add built-in functions to Jinja2 environment
 app.jinja_env.globals.update(min=min, max=max)
 
-model_path = os.path.join(os.path.dirname(__file__), 'model.pkl')
-try:
-    model = joblib.load(model_path)
-except Exception as e:
-    model = None
-    print(f"Failed to load model: {e}")
+# Selection model as flattened arrays; picks up a newly exported file by itself
+predictor = Predictor()
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'candidates.db')
+migrate(DB_PATH)
+
+# Leaderboard PNGs are only redrawn when their inputs change; stale ones are
+# served immediately and redrawn by a background worker.
+graph_cache = GraphCache(DB_PATH, os.path.join(app.root_path, 'static'),
+                         os.path.join(os.path.dirname(__file__), 'database', 'graph_cache.json'),
+                         background=os.environ.get('GRAPH_CACHE_BACKGROUND', '1') == '1')
 
 def get_db_connection():
-    return sqlite3.connect(DB_PATH)
+    # Reused per thread; close() only ends the transaction
+    return connect(DB_PATH)
+
+def latest_candidate(c, user_id):
+    # Seeks idx_candidates_user_id instead of scanning the table
+    return c.execute("SELECT * FROM candidates WHERE user_id=? ORDER BY id DESC LIMIT 1", (user_id,)).fetchone()
+
+# Repeated prompts (same resume, same skills and experience, unchanged
+# profile) are answered from a persistent cache instead of the model.
+llm_cache = LLMCache(DB_PATH, max_entries=int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 5000)))
+
+# Shared by every LLM call site: pooled keep-alive connections, bounded retries
+# and a circuit breaker so callers fall back instantly while Ollama is down.
+ollama = OllamaClient(cache=llm_cache)
 
 import json
 
+FALLBACK_QUESTIONS = [
+    {"question": "What is polymorphism?", "options": ["Many forms", "Database", "Networking", "None"], "answer": "Many forms"},
+    {"question": "What is inheritance?", "options": ["Class hierarchy", "Variables", "Loop", "None"], "answer": "Class hierarchy"},
+    {"question": "What is encapsulation?", "options": ["Data hiding", "Speed", "Sorting", "None"], "answer": "Data hiding"},
+    {"question": "What does API stand for?", "options": ["Application Programming Interface", "Apple Pie", "Array", "None"], "answer": "Application Programming Interface"},
+    {"question": "What is a primary key?", "options": ["Unique identifier", "String", "Foreign key", "None"], "answer": "Unique identifier"}
+]
+
+def _is_valid_quiz(response_text):
+    try:
+        return isinstance(parse_questions(response_text.strip()), list)
+    except ValueError:
+        return False
+
 def generate_quiz_questions(experience, skills_str):
     prompt = f"Generate exactly 5 multiple choice questions for a technical interview. Candidate has {experience} years experience and skills: {skills_str}. Output ONLY valid JSON containing an array of objects. Each object must have 'question' (string), 'options' (array of 4 strings), and 'answer' (the exact string from options that is correct)."
     try:
-        r = requests.post('http://localhost:11434/api/generate', json={
-            "model": "gemma3:4b",
-            "prompt": prompt,
-            "stream": False
-        }, timeout=30)
-        json_data = r.json()
-        if 'response' in json_data:
-            response_text = json_data['response'].strip()
-            # Try to extract just the JSON part
-            match = re.search(r'\[.*\]', response_text, re.DOTALL)
-            if match:
-                return json.loads(match.group())
-            else:
-                return json.loads(response_text)
+        response_text = ollama.generate(prompt, timeout=30, cache_kind='generate_quiz_questions',
+                                        cacheable=_is_valid_quiz).strip()
+        return parse_questions(response_text)
     except Exception as e:
         print("Ollama Error (generate mcq):", e)
     
     # Fallback questions
-    return [
-        {"question": "What is polymorphism?", "options": ["Many forms", "Database", "Networking", "None"], "answer": "Many forms"},
-        {"question": "What is inheritance?", "options": ["Class hierarchy", "Variables", "Loop", "None"], "answer": "Class hierarchy"},
-        {"question": "What is encapsulation?", "options": ["Data hiding", "Speed", "Sorting", "None"], "answer": "Data hiding"},
-        {"question": "What does API stand for?", "options": ["Application Programming Interface", "Apple Pie", "Array", "None"], "answer": "Application Programming Interface"},
-        {"question": "What is a primary key?", "options": ["Unique identifier", "String", "Foreign key", "None"], "answer": "Unique identifier"}
-    ]
+    return FALLBACK_QUESTIONS
 
 def evaluate_resume(text):
     prompt = f"Evaluate the following resume text. Provide a score out of 100 based on quality, and a brief summary. Format exactly like:\nScore: [number]\nSummary: [your summary]\nResume Text: {text[:1500]}"
     try:
-        r = requests.post('http://localhost:11434/api/generate', json={
-            "model": "gemma3:4b",
-            "prompt": prompt,
-            "stream": False
-        }, timeout=30)
-        json_data = r.json()
-        if 'response' in json_data:
-            res = json_data['response'].strip()
-            score = 50
-            summary = "No summary provided."
-            score_match = re.search(r'Score:\s*(\d+)', res)
-            if score_match:
-                score = min(100, max(0, int(score_match.group(1))))
-            summary_match = re.search(r'Summary:\s*(.*)', res, re.DOTALL)
-            if summary_match:
-                summary = summary_match.group(1).strip()
-            return score, summary
+        res = ollama.generate(prompt, timeout=30, cache_kind='evaluate_resume',
+                              cacheable=lambda text: re.search(r'Score:\s*\d+', text) is not None).strip()
+        score = 50
+        summary = "No summary provided."
+        score_match = re.search(r'Score:\s*(\d+)', res)
+        if score_match:
+            score = min(100, max(0, int(score_match.group(1))))
+        summary_match = re.search(r'Summary:\s*(.*)', res, re.DOTALL)
+        if summary_match:
+            summary = summary_match.group(1).strip()
+        return score, summary
     except Exception as e:
         print("Ollama Error (resume eval):", e)
     return 50, "Could not evaluate resume."
 
+# The LLM calls made for an application run concurrently on a bounded pool
+# instead of blocking the /apply request; the quiz page waits for them.
+task_queue = TaskQueue(DB_PATH, max_workers=int(os.environ.get('LLM_TASK_WORKERS', 4)))
+task_queue.register('evaluate_resume', evaluate_resume)
+task_queue.register('generate_quiz_questions', generate_quiz_questions)
+task_queue.register('rescore_pending', lambda: rescore_pending(DB_PATH, predictor))
+task_queue.register('score_new_job', lambda job_id: score_new_job(DB_PATH, job_id))
+task_queue.register('rebuild_matches', lambda: rebuild_matches(DB_PATH))
+
+# Questions are pre-generated per skill and experience bucket so most quizzes
+# are assembled instantly; the LLM task above is only the fallback.
+quiz_bank = QuestionBank(DB_PATH, ollama, ALL_SKILLS)
+
+_background_pid = None
+
+def start_background():
+    # Task recovery and the quiz bank filler run once per process. Threads
+    # do not survive a fork, so with PRELOAD=1 this waits for the first
+    # request in each worker instead of running in the master.
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    _background_pid = os.getpid()
+    task_queue.recover()
+    if os.environ.get('QUIZ_BANK_FILLER', '1') == '1':
+        quiz_bank.start_filler()
+
+@app.before_request
+def start_background_work():
+    start_background()
+
 @app.route('/')
 def index():
     if 'user_id' in session:
@@ -154,44 +227,95 @@ def apply():
         path = os.path.join("uploads", resume.filename)
         resume.save(path)
         
-        skills_count, skills_str = extract_skills(path)
-        resume_text = extract_resume_text(path)
-        r_score, r_summary = evaluate_resume(resume_text)
-        
-        conn = get_db_connection()
-        jobs = conn.execute("SELECT description, skills_required FROM jobs").fetchall()
-        conn.close()
+        parsed = ingest_resume(path)
+        resume_text = parsed['text']
+        skills_count = parsed['skills_count']
+        skills_str = parsed['skills']
+        # The LLM calls start now and run side by side while the candidate moves on;
+        # the quiz only needs the LLM when the question bank cannot cover it yet.
+        resume_task = task_queue.submit('evaluate_resume', resume_text)
+        questions = quiz_bank.assemble_quiz(exp, skills_str)
+        quiz_task = task_queue.submit('generate_quiz_questions', exp, skills_str) if questions is None else None
         
-        max_match = 0.0
-        if jobs:
-            for job in jobs:
-                jd = f"{job[0]} {job[1]}"
-                score = match_resume(resume_text, jd)
-                if score > max_match:
-                    max_match = score
+        # One transform against the precomputed job index scores every job at once
+        job_matches = score_resume_against_jobs(DB_PATH, resume_text)
+        max_match = max(job_matches.values(), default=0.0)
         
         session['candidate_name'] = name
         session['candidate_exp'] = exp
         session['candidate_skills_count'] = skills_count
         session['candidate_skills_str'] = skills_str
-        session['resume_score'] = r_score
-        session['resume_summary'] = r_summary
         session['resume_match'] = max_match
-        
-        # Pre-generate questions
-        questions = generate_quiz_questions(exp, skills_str)
-        session['quiz_questions'] = questions
+        # The text itself is too big for the session cookie; /quiz reads it
+        # back from the resume cache by digest
+        session['resume_path'] = path
+        session['resume_sha256'] = parsed['sha256']
+        session['resume_task'] = resume_task
+        session['quiz_task'] = quiz_task
+        session.pop('resume_score', None)
+        session.pop('resume_summary', None)
+        if questions is None:
+            session.pop('quiz_questions', None)
+        else:
+            session['quiz_questions'] = questions
         
         return redirect(url_for('quiz'))
         
     return render_template('apply.html')
 
+def _application_tasks():
+    return {'resume': session.get('resume_task'), 'quiz': session.get('quiz_task')}
+
+def _quiz_questions():
+    # Returns None while the quiz is still being generated
+    if 'quiz_questions' in session:
+        return session['quiz_questions']
+    task_id = session.get('quiz_task')
+    task = task_queue.get([task_id]).get(task_id)
+    if task is not None and task['status'] not in FINISHED:
+        return None
+    questions = task['result'] if task and task['status'] == 'done' else FALLBACK_QUESTIONS
+    session['quiz_questions'] = questions
+    return questions
+
+def _resume_evaluation():
+    if 'resume_score' not in session:
+        task_id = session.get('resume_task')
+        task = task_queue.wait([task_id], timeout=30).get(task_id)
+        if task and task['status'] == 'done':
+            score, summary = task['result']
+        else:
+            score, summary = 50, "Could not evaluate resume."
+        session['resume_score'] = score
+        session['resume_summary'] = summary
+    return session['resume_score'], session['resume_summary']
+
+@app.route('/api/apply/status')
+def apply_status():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    task_ids = _application_tasks()
+    # Answers immediately; the quiz page polls instead of holding a worker
+    tasks = task_queue.get(list(task_ids.values()))
+    status = {}
+    for name, task_id in task_ids.items():
+        task = tasks.get(task_id)
+        if task:
+            status[name] = {k: task[k] for k in ('status', 'queued_seconds', 'run_seconds') if k in task}
+    quiz_task = tasks.get(task_ids['quiz'])
+    ready = 'quiz_questions' in session or quiz_task is None or quiz_task['status'] in FINISHED
+    return jsonify({'ready': ready, 'tasks': status})
+
 @app.route('/quiz', methods=['GET', 'POST'])
 def quiz():
     if 'candidate_name' not in session:
         return redirect(url_for('apply'))
         
-    questions = session.get('quiz_questions', [])
+    questions = _quiz_questions()
+    if questions is None:
+        if request.method == 'POST':
+            return redirect(url_for('quiz'))
+        return render_template('quiz.html', questions=[], pending=True)
         
     if request.method == 'POST':
         correct_count = 0
@@ -207,27 +331,34 @@ def quiz():
         skills_count = session['candidate_skills_count']
         skills_str = session['candidate_skills_str']
         resume_match = session.get('resume_match', 0.0)
+        r_score, r_summary = _resume_evaluation()
+        resume_text = ingest_resume(session['resume_path'], session.get('resume_sha256'))['text'] if 'resume_path' in session else None
         
         result = 0
-        if model:
-            try:
-                # The model expects [exp, skills, quiz] exactly
-                prediction = model.predict([[exp, skills_count, score]])[0]
-                result = int(prediction)
-            except Exception as e:
-                print("Model prediction error:", e)
+        model_version = None
+        try:
+            # The model expects [exp, skills, quiz] exactly
+            result, model_version = predictor.predict_one(exp, skills_count, score)
+        except Exception as e:
+            print("Model prediction error:", e)
         
         conn = get_db_connection()
-        try:
-            conn.execute("INSERT INTO candidates (user_id, name, experience, skills, quiz, selected, resume_score, summary, skills_list, resume_match) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                         (session['user_id'], session['candidate_name'], exp, skills_count, score, result, session.get('resume_score', 0), session.get('resume_summary', ''), skills_str, resume_match))
-        except sqlite3.OperationalError:
-            # Fallback if some columns don't exist
-            conn.execute("INSERT INTO candidates (user_id, name, experience, skills, quiz, selected, resume_score, summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                         (session['user_id'], session['candidate_name'], exp, skills_count, score, result, session.get('resume_score', 0), session.get('resume_summary', '')))
-
+        cur = conn.execute("INSERT INTO candidates (user_id, name, experience, skills, quiz, selected, resume_score, summary, skills_list, resume_match, model_version, resume_text) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (session['user_id'], session['candidate_name'], exp, skills_count, score, result, r_score, r_summary, skills_str, resume_match, model_version, resume_text))
+        candidate_id = cur.lastrowid
         conn.commit()
         conn.close()
+        # Per-job scores for the jobs this candidate qualifies for; also brings
+        # resume_match up to date with any job added since /apply
+        try:
+            score_candidate(DB_PATH, candidate_id)
+        except Exception as e:
+            print("Candidate match scoring error:", e)
+        # Appends this candidate (and any other unindexed one) to the vector index
+        try:
+            update_candidate_index(DB_PATH)
+        except Exception as e:
+            print("Candidate index update error:", e)
         
         session['last_result'] = result
         session['last_score'] = score
@@ -235,6 +366,10 @@ def quiz():
         # lock them out of resubmitting quiz by clearing application cache
         session.pop('candidate_name', None)
         session.pop('quiz_questions', None)
+        session.pop('quiz_task', None)
+        session.pop('resume_task', None)
+        session.pop('resume_path', None)
+        session.pop('resume_sha256', None)
         
         return redirect(url_for('user_dashboard'))
         
@@ -247,35 +382,20 @@ def user_dashboard():
         
     conn = get_db_connection()
     c = conn.cursor()
-    candidate = c.execute("SELECT * FROM candidates WHERE user_id=? ORDER BY id DESC LIMIT 1", (session['user_id'],)).fetchone()
-    jobs = c.execute("SELECT * FROM jobs").fetchall()
+    candidate = latest_candidate(c, session['user_id'])
     conn.close()
+    catalog = get_skill_catalog(DB_PATH)
     
     matched_jobs = []
+    matched_total = 0
     candidate_missing_skills = []
     
     if candidate:
-        quiz_score = candidate[5]
-        resume_score = candidate[7] or 0
-        candidate_skills = candidate[9] or ""
-        
-        # Calculate all missing skills from jobs
-        all_required_skills = set()
-        for job in jobs:
-            job_skills = [s.strip().lower() for s in job[3].split(",")]
-            all_required_skills.update(job_skills)
-        
-        # Find missing skills
-        cand_skills_lower = candidate_skills.lower() if candidate_skills else ""
-        candidate_missing_skills = [s for s in all_required_skills if s not in cand_skills_lower]
-        
-        for job in jobs:
-            if quiz_score >= job[4] and resume_score >= job[5]:
-                missing = skill_gap(candidate_skills, job[3])
-                matched_jobs.append(job + (missing,))
+        candidate_missing_skills = catalog.missing_skills(candidate[9])
+        matched_total, matched_jobs = match_jobs(DB_PATH, candidate)
                 
     return render_template('user_dashboard.html', candidate=candidate, matched_jobs=matched_jobs, 
-                         missing_skills=candidate_missing_skills)
+                         matched_total=matched_total, missing_skills=candidate_missing_skills)
 
 @app.route('/admin/job/add', methods=['POST'])
 def add_job():
@@ -288,25 +408,48 @@ def add_job():
     min_resume = float(request.form.get('min_resume_score', 75))
     
     conn = get_db_connection()
-    conn.execute("INSERT INTO jobs (title, description, skills_required, min_quiz_score, min_resume_score) VALUES (?, ?, ?, ?, ?)",
+    cur = conn.execute("INSERT INTO jobs (title, description, skills_required, min_quiz_score, min_resume_score) VALUES (?, ?, ?, ?, ?)",
                  (title, desc, skills, min_quiz, min_resume))
+    job_id = cur.lastrowid
     conn.commit()
     conn.close()
+    # Scores the new job against every stored candidate off the request, or
+    # everything again when the job index had to be refitted
+    if on_job_added(DB_PATH, job_id, desc, skills):
+        task_queue.submit('score_new_job', job_id)
+    else:
+        task_queue.submit('rebuild_matches')
+    invalidate_skill_catalog()
+    # Career advice is built from the open jobs, so cached reports are out of date
+    llm_cache.invalidate('career_ai')
     return redirect(url_for('admin_jobs'))
 
-@app.route('/api/chat', methods=['POST'])
-def api_chat():
-    if 'user_id' not in session:
-        return jsonify({'error': 'Unauthorized'}), 401
-        
-    user_msg = request.json.get('message', '')
-    if not user_msg:
-        return jsonify({'error': 'Message is empty'}), 400
-        
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _stream_llm(prompt, timeout, cache_kind, timeout_message, error_message):
+    # Passes Ollama's tokens through as Server-Sent Events. If the browser goes
+    # away the generator is closed, which closes the upstream request too.
+    def generate():
+        tokens = ollama.stream(prompt, timeout=timeout, cache_kind=cache_kind)
+        try:
+            for token in tokens:
+                yield _sse('token', {'token': token})
+            yield _sse('done', {})
+        except OllamaTimeout:
+            yield _sse('error', {'error': timeout_message})
+        except OllamaError as e:
+            print("Ollama Error (stream):", e)
+            yield _sse('error', {'error': error_message})
+        finally:
+            tokens.close()
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _chat_prompt(user_msg):
     conn = get_db_connection()
     c = conn.cursor()
-    candidate = c.execute("SELECT * FROM candidates WHERE user_id=? ORDER BY id DESC LIMIT 1", (session['user_id'],)).fetchone()
-    jobs = c.execute("SELECT * FROM jobs").fetchall()
+    candidate = latest_candidate(c, session['user_id'])
     conn.close()
     
     context = "No candidate profile found. Only generic advice can be given."
@@ -318,33 +461,43 @@ def api_chat():
         r_score = candidate[7]
         context = f"Candidate Profile Context - Experience: {exp} years. Extracted Skills: {skills}. Quiz Score: {quiz}/100. Resume Score: {r_score}/100. Summary of resume: {resume_summary}. "
         
-        all_required_skills = set()
-        for job in jobs:
-            for s in job[3].split(","):
-                all_required_skills.add(s.strip().lower())
-                
-        cand_skills_lower = skills.lower()
-        missing = [s for s in all_required_skills if s not in cand_skills_lower]
+        missing = get_skill_catalog(DB_PATH).missing_skills(candidate[9])
         context += f"Often required job skills missing from candidate profile: {', '.join(missing)}. "
         
     prompt = f"System: You are an internal chatbot assistant embedded within the SkillPalavar application on the Candidate Dashboard. You have access to the user's specific context: {context}\n"
     prompt += "Use this specific context to answer the candidate's technical career questions. Provide very concise, concrete advice. Do not output anything other than the direct answer.\n"
     prompt += f"User Message: {user_msg}\nAssistant:"
-    
+    return prompt
+
+@app.route('/api/chat', methods=['POST'])
+def api_chat():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    user_msg = request.json.get('message', '')
+    if not user_msg:
+        return jsonify({'error': 'Message is empty'}), 400
+        
+    prompt = _chat_prompt(user_msg)
     try:
-        r = requests.post('http://localhost:11434/api/generate', json={
-            "model": "gemma3:4b",
-            "prompt": prompt,
-            "stream": False
-        }, timeout=30)
-        json_data = r.json()
-        if 'response' in json_data:
-            return jsonify({'response': json_data['response'].strip()})
-        return jsonify({'error': 'Unexpected response from AI'}), 500
-    except Exception as e:
+        return jsonify({'response': ollama.generate(prompt, timeout=30, cache_kind='chat').strip()})
+    except OllamaError as e:
         print("Chatbot Error:", e)
         return jsonify({'error': 'Unable to connect to AI engine.'}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def api_chat_stream():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    user_msg = request.json.get('message', '')
+    if not user_msg:
+        return jsonify({'error': 'Message is empty'}), 400
+        
+    return _stream_llm(_chat_prompt(user_msg), 30, 'chat',
+                       "The AI is taking too long to respond. Please try again.",
+                       "Unable to connect to AI engine.")
+
 @app.route('/admin/candidate/<int:candidate_id>/decision', methods=['POST'])
 def candidate_decision(candidate_id):
     if 'user_id' not in session or session.get('is_admin') == 0:
@@ -363,7 +516,7 @@ def candidate_decision(candidate_id):
         return jsonify({'error': 'Candidate not found'}), 404
         
     new_status = 1 if action == 'approve' else 2 # 2 representing rejected
-    c.execute("UPDATE candidates SET selected=? WHERE id=?", (new_status, candidate_id))
+    c.execute("UPDATE candidates SET selected=?, reviewed_at=CURRENT_TIMESTAMP WHERE id=?", (new_status, candidate_id))
     conn.commit()
     conn.close()
     
@@ -374,13 +527,33 @@ def dashboard():
     if 'user_id' not in session or session.get('is_admin') == 0:
         return redirect(url_for('index'))
         
+    filters = parse_filters(request.args)
+    sort, direction = parse_sort(request.args)
     conn = get_db_connection()
     c = conn.cursor()
-    data = c.execute("SELECT * FROM candidates ORDER BY id DESC").fetchall()
+    data, next_cursor = candidate_page(c, filters, sort, direction)
+    counts = status_counts(c)
     jobs = c.execute("SELECT * FROM jobs ORDER BY id DESC").fetchall()
     conn.close()
     
-    return render_template('dashboard.html', data=data, jobs=jobs)
+    return render_template('dashboard.html', data=data, jobs=jobs, counts=counts, next_cursor=next_cursor,
+                           filters=request.args, sort=sort, direction=direction)
+
+@app.route('/api/candidates')
+def api_candidates():
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    filters = parse_filters(request.args)
+    sort, direction = parse_sort(request.args)
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    conn = get_db_connection()
+    rows, next_cursor = candidate_page(conn, filters, sort, direction, request.args.get('cursor'), limit)
+    conn.close()
+    result = {'candidates': [candidate_json(row) for row in rows], 'next_cursor': next_cursor}
+    if request.args.get('format') == 'html':
+        # The dashboard appends server-rendered rows so the markup lives in one place
+        result['html'] = render_template('_candidate_rows.html', data=rows)
+    return jsonify(result)
 
 @app.route('/admin/analytics')
 def admin_analytics():
@@ -389,38 +562,120 @@ def admin_analytics():
         
     conn = get_db_connection()
     c = conn.cursor()
-    data = c.execute("SELECT * FROM candidates ORDER BY id DESC").fetchall()
+    stats = summary(c)
     jobs = c.execute("SELECT * FROM jobs ORDER BY id DESC").fetchall()
+    job_stats = job_breakdown(c, jobs)
     conn.close()
     
-    job_graphs = []
-    
-    for job in jobs:
-        job_id = job[0]
-        graph_filename = f'ranking_job_{job_id}.png'
-        graph_path = os.path.join(app.root_path, 'static', graph_filename)
-        if generate_ranking_graph(DB_PATH, graph_path, job_id=job_id):
-            job_graphs.append({'id': job_id, 'title': job[1], 'filename': graph_filename})
-            
-    global_graph_path = os.path.join(app.root_path, 'static', 'ranking.png')
-    global_graph_exists = generate_ranking_graph(DB_PATH, global_graph_path)
-    if global_graph_exists:
-        job_graphs.insert(0, {'id': 'global', 'title': 'Overall Macro Leaderboard', 'filename': 'ranking.png'})
-    
-    selected_count = sum(1 for row in data if row[6] == 1)
-    pending_count = sum(1 for row in data if row[6] == 0)
-    scores = [(row[5] or 0, row[7] or 0) for row in data]
-    avg_quiz = round(sum(s[0] for s in scores) / len(scores) if scores else 0, 1)
-    avg_resume = round(sum(s[1] for s in scores) / len(scores) if scores else 0, 1)
+    job_graphs = graph_cache.get_graphs(jobs)
     
     chart_data = {
         'status_labels': ['Selected', 'Pending Review'],
-        'status_counts': [selected_count, pending_count],
-        'avg_quiz': avg_quiz,
-        'avg_resume': avg_resume
+        'status_counts': [stats['selected'], stats['pending']],
+        'avg_quiz': stats['avg_quiz'],
+        'avg_resume': stats['avg_resume']
     }
     
-    return render_template('admin_analytics.html', chart_data=chart_data, job_graphs=job_graphs)
+    return render_template('admin_analytics.html', chart_data=chart_data, job_graphs=job_graphs, job_stats=job_stats,
+                           graph_cache_stats=graph_cache.get_stats())
+
+@app.route('/admin/analytics/graph_cache')
+def graph_cache_stats():
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(graph_cache.get_stats())
+
+@app.route('/admin/leaderboard')
+@app.route('/admin/job/<int:job_id>/leaderboard')
+def leaderboard(job_id=None):
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    k = min(max(request.args.get('k', 20, type=int), 1), 500)
+    engine = get_ranking_engine(DB_PATH)
+    if job_id is not None and job_id not in engine.job_titles:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job_id': job_id, 'candidates': engine.top_k(job_id, k)})
+
+@app.route('/admin/ollama/stats')
+def ollama_stats():
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(ollama.stats())
+
+@app.route('/admin/quiz_bank/stats')
+def quiz_bank_stats():
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(quiz_bank.stats())
+
+@app.route('/admin/llm_cache/stats')
+def llm_cache_stats():
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(llm_cache.stats())
+
+@app.route('/admin/model')
+def model_info():
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    predictor.load()
+    return jsonify({'version': predictor.version, 'path': predictor.path})
+
+@app.route('/admin/model/reload', methods=['POST'])
+def model_reload():
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if not predictor.reload():
+        return jsonify({'error': 'Model could not be loaded', 'version': predictor.version}), 500
+    return jsonify({'version': predictor.version})
+
+@app.route('/admin/model/rescore', methods=['POST'])
+def model_rescore():
+    # Re-predicts every pending candidate in the background after a retrain
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    predictor.load()
+    return jsonify({'task': task_queue.submit('rescore_pending'), 'version': predictor.version}), 202
+
+@app.route('/admin/job/<int:job_id>/top_candidates')
+def job_top_candidates(job_id):
+    # Best candidates for a job by resume/job text similarity combined with
+    # quiz and resume scores, from the memory-mapped candidate index
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    k = min(max(request.args.get('k', 20, type=int), 1), MAX_K)
+    conn = get_db_connection()
+    job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    started = time.perf_counter()
+    candidates = top_candidates(DB_PATH, job, k)
+    return jsonify({'job_id': job_id, 'title': job[1], 'k': k, 'candidates': candidates,
+                    'indexed': get_candidate_index(DB_PATH).count,
+                    'ms': round((time.perf_counter() - started) * 1000, 1)})
+
+@app.route('/admin/metrics')
+def metrics_endpoint():
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/startup')
+def startup_report():
+    # Where this worker's startup went, and which lazy loads have happened
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(dict(startup.report(), pid=os.getpid()))
+
+@app.route('/admin/model/rescore/<task_id>')
+def model_rescore_status(task_id):
+    if 'user_id' not in session or session.get('is_admin') == 0:
+        return jsonify({'error': 'Unauthorized'}), 401
+    task = task_queue.get([task_id]).get(task_id)
+    if task is None or task['kind'] != 'rescore_pending':
+        return jsonify({'error': 'Task not found'}), 404
+    return jsonify(task)
 
 @app.route('/admin/jobs')
 def admin_jobs():
@@ -437,16 +692,26 @@ def admin_jobs():
 def export_csv():
     if 'user_id' not in session or session.get('is_admin') == 0:
         return redirect(url_for('index'))
-        
-    conn = get_db_connection()
-    df = pd.read_sql_query("SELECT * FROM candidates", conn)
-    conn.close()
-    
-    csv_data = df.to_csv(index=False)
+
+    # ?format=parquet, ?gzip=1, ?columns=id,name,quiz and the dashboard filters
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'parquet'):
+        return jsonify({'error': 'format must be csv or parquet'}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export needs pyarrow installed'}), 501
+    columns = parse_columns(request.args.get('columns'))
+    chunks = iter_chunks(get_db_connection(), columns, parse_filters(request.args))
+
+    if fmt == 'parquet':
+        body, mimetype, filename = parquet_stream(chunks, columns), "application/vnd.apache.parquet", "candidates.parquet"
+    else:
+        body, mimetype, filename = csv_stream(chunks, columns), "text/csv", "candidates.csv"
+    if request.args.get('gzip') == '1':
+        body, mimetype, filename = gzip_stream(body), "application/gzip", filename + ".gz"
     return Response(
-        csv_data,
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment;filename=candidates.csv"}
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment;filename={filename}"}
     )
 
 @app.route('/compare', methods=['POST'])
@@ -467,62 +732,79 @@ def compare():
     
     return render_template('compare.html', candidates=candidates)
 
+def _career_prompt():
+    conn = get_db_connection()
+    c = conn.cursor()
+    candidate = latest_candidate(c, session['user_id'])
+    conn.close()
+    
+    context = ""
+    if candidate:
+        skills = candidate[9] or "None"
+        resume_summary = candidate[8] or "None"
+        context = f"Candidate Skills: {skills}. Resume Summary (based on evaluation): {resume_summary}. "
+        
+        missing = get_skill_catalog(DB_PATH).missing_skills(candidate[9])
+        context += f"Often required job skills missing from candidate profile: {', '.join(missing)}. "
+        
+    prompt = f"You are an expert AI Career Counselor. Here is the user's profile: {context}\n"
+    prompt += "Based on this profile and the available job requirements, thoroughly analyze the resume. Specifically: 1. Point out explicitly the limitations or weaknesses of this individual resume/skillset. 2. Strongly highlight what ALL skills are important and should be learned to improve their job prospects for the available jobs. Use clear formatting like bullet points."
+    return prompt
+
 @app.route('/career_ai', methods=['GET', 'POST'])
 def career_ai():
     if 'user_id' not in session:
         return redirect(url_for('login'))
         
-    conn = get_db_connection()
-    c = conn.cursor()
-    candidate = c.execute("SELECT * FROM candidates WHERE user_id=? ORDER BY id DESC LIMIT 1", (session['user_id'],)).fetchone()
-    jobs = c.execute("SELECT * FROM jobs").fetchall()
-    conn.close()
-    
     analysis_result = None
-    loading = False
     error = None
     
     if request.method == 'POST':
-        loading = True
-        context = ""
-        if candidate:
-            skills = candidate[9] or "None"
-            resume_summary = candidate[8] or "None"
-            context = f"Candidate Skills: {skills}. Resume Summary (based on evaluation): {resume_summary}. "
-            
-            all_required_skills = set()
-            for job in jobs:
-                for s in job[3].split(","):
-                    all_required_skills.add(s.strip().lower())
-                    
-            cand_skills_lower = skills.lower()
-            missing = [s for s in all_required_skills if s not in cand_skills_lower]
-            context += f"Often required job skills missing from candidate profile: {', '.join(missing)}. "
-            
-        prompt = f"You are an expert AI Career Counselor. Here is the user's profile: {context}\n"
-        prompt += "Based on this profile and the available job requirements, thoroughly analyze the resume. Specifically: 1. Point out explicitly the limitations or weaknesses of this individual resume/skillset. 2. Strongly highlight what ALL skills are important and should be learned to improve their job prospects for the available jobs. Use clear formatting like bullet points."
-        
         try:
-            r = requests.post('http://localhost:11434/api/generate', json={
-                "model": "gemma3:4b",
-                "prompt": prompt,
-                "stream": False
-            }, timeout=120)
-            json_data = r.json()
-            if 'response' in json_data:
-                analysis_result = json_data['response'].strip()
-            else:
-                error = "Unexpected response from AI."
-        except requests.exceptions.Timeout:
+            analysis_result = ollama.generate(_career_prompt(), timeout=120, cache_kind='career_ai').strip()
+        except OllamaTimeout:
             error = "The AI is taking too long to respond. Please try again."
-        except Exception as e:
+        except OllamaError as e:
             print("Ollama Error (career ai):", e)
             error = "Sorry, I am having trouble connecting to my AI brain. Is Ollama running?"
-            
-        loading = False
         
     return render_template('career_ai.html', analysis_result=analysis_result, error=error)
 
+@app.route('/career_ai/stream', methods=['POST'])
+def career_ai_stream():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return _stream_llm(_career_prompt(), 120, 'career_ai',
+                       "The AI is taking too long to respond. Please try again.",
+                       "Sorry, I am having trouble connecting to my AI brain. Is Ollama running?")
+
+def preload():
+    # Loads up front everything that is otherwise loaded on first use. Meant
+    # for the master of a pre-fork server (PRELOAD=1 gunicorn --preload app:app)
+    # so every worker starts warm and shares the loaded pages copy-on-write.
+    started = time.perf_counter()
+    get_skill_matcher()
+    get_pdfplumber()
+    load_pyplot()
+    predictor.load()
+    get_job_index(DB_PATH)
+    with startup.stage('ranking engine'):
+        get_ranking_engine(DB_PATH)
+    with startup.stage('skill catalog'):
+        get_skill_catalog(DB_PATH)
+    update_candidate_index(DB_PATH)
+    # Workers open their own SQLite connections after the fork
+    close_all()
+    print(f"Preloaded in {(time.perf_counter() - started) * 1000:.0f} ms:")
+    startup.print_report()
+
+startup.record('app setup', time.perf_counter() - setup_started)
+
+if os.environ.get('PRELOAD') == '1':
+    preload()
+else:
+    start_background()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
 # End of file
\ No newline at end of file
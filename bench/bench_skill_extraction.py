@@ -0,0 +1,87 @@
+import os
+import re
+import sys
+import time
+import argparse
+import spacy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.resume_parser import ALL_SKILLS, SKILLS, skills_from_text, skills_from_texts
+from bench.fixtures import make_corpus
+
+# Compares the PhraseMatcher skill extraction against the previous
+# implementation (full en_core_web_sm pipeline, token lookups plus a substring
+# scan of every noun chunk) on a seeded synthetic resume corpus.
+
+def legacy_extract(nlp_full, text):
+    text = text.lower()
+    if not text:
+        return 0, ""
+
+    count = 0
+    for skill in SKILLS:
+        if skill in text:
+            count += 1
+
+    doc = nlp_full(text)
+    found_skills = set()
+    for token in doc:
+        if token.text.lower() in ALL_SKILLS:
+            found_skills.add(token.text.lower())
+
+    for chunk in doc.noun_chunks:
+        chunk_text = chunk.text.lower()
+        for skill in ALL_SKILLS:
+            if skill in chunk_text:
+                found_skills.add(skill)
+
+    return count, ", ".join(sorted(list(found_skills)))
+
+def whole_word(skill, text):
+    return re.search(rf"(?<![\w+#]){re.escape(skill)}(?![\w+#])", text) is not None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PhraseMatcher skill extraction against the legacy scan")
+    parser.add_argument('--docs', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs, args.seed)
+    nlp_full = spacy.load("en_core_web_sm")
+
+    start = time.perf_counter()
+    legacy = [legacy_extract(nlp_full, text) for text in corpus]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = [skills_from_text(text) for text in corpus]
+    current_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = skills_from_texts(corpus)
+    batched_time = time.perf_counter() - start
+
+    # The legacy chunk scan also reports skills that only occur inside longer
+    # words ("java" in "javascript", "go" in "google"); those are false
+    # positives and are reported separately from real disagreements.
+    mismatches = 0
+    substring_only = 0
+    for text, old, new in zip(corpus, legacy, current):
+        old_skills = set(filter(None, old[1].split(", ")))
+        new_skills = set(filter(None, new[1].split(", ")))
+        extra = {s for s in old_skills - new_skills if not whole_word(s, text.lower())}
+        substring_only += len(extra)
+        if old[0] != new[0] or (old_skills - extra) != new_skills:
+            mismatches += 1
+
+    print(f"docs: {len(corpus)}")
+    print(f"legacy:        {legacy_time * 1000 / len(corpus):.2f} ms/doc")
+    print(f"phrasematcher: {current_time * 1000 / len(corpus):.2f} ms/doc ({legacy_time / current_time:.1f}x)")
+    print(f"nlp.pipe:      {batched_time * 1000 / len(corpus):.2f} ms/doc ({legacy_time / batched_time:.1f}x)")
+    print(f"batched output identical to single: {batched == current}")
+    print(f"legacy substring-only false positives: {substring_only}")
+    print(f"documents with differing output: {mismatches}")
+    return 1 if mismatches or batched != current else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+from bench.fixtures import write_resume_pdf, make_database
+from ml.resume_parser import extract_resume_text, extract_skills, match_resume
+from ml.skill_gap import skill_gap
+from ml.ranking import load_ranking_engine
+from ml.predictor import Predictor
+from ml.generate_data import generate
+from generate_graph import generate_ranking_graph
+from database.db import connect
+
+# Times the ml/ hot paths and the leaderboard rendering over a range of input
+# sizes on seeded fixtures, records peak Python memory for each and writes
+# everything to JSON. With --compare the run fails when a case got slower
+# or bigger than the baseline by more than the threshold.
+#
+#   python bench/bench_suite.py --output before.json
+#   python bench/bench_suite.py --compare before.json
+
+PROFILES = {
+    'quick': {'pages': [1, 5], 'candidates': [10, 1000], 'jobs': [1, 50]},
+    'full': {'pages': [1, 5, 20], 'candidates': [10, 1000, 10000], 'jobs': [1, 50, 500]},
+}
+
+# Each case is timed for at least this long (and at least --repeat times)
+MIN_SECONDS = 0.2
+
+# Differences below these are noise, whatever the ratio
+MIN_DELTA_MS = 0.5
+MIN_DELTA_KB = 64
+
+def measure(fn, repeat):
+    # One untimed call first so lazy imports and caches are not measured
+    fn()
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeat or time.perf_counter() - started < MIN_SECONDS:
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    # Memory is traced in a separate call, tracemalloc slows everything down
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'median_ms': round(statistics.median(times) * 1000, 3), 'min_ms': round(min(times) * 1000, 3),
+            'runs': len(times), 'peak_kb': round(peak / 1024, 1)}
+
+def cases(workdir, sizes, seed):
+    # Yields (name, fn); fixtures are built as each group needs them
+    for pages in sizes['pages']:
+        pdf = write_resume_pdf(os.path.join(workdir, f"resume_{pages}.pdf"), pages, seed)
+        text = extract_resume_text(pdf)
+        yield f"extract_resume_text[pages={pages}]", lambda pdf=pdf: extract_resume_text(pdf)
+        yield f"extract_skills[pages={pages}]", lambda pdf=pdf: extract_skills(pdf)
+        yield (f"match_resume[pages={pages}]",
+               lambda text=text: match_resume(text, "Backend engineer building python services with sql, docker and aws"))
+
+    predictor = Predictor()
+    X, _ = generate(max(sizes['candidates']), seed)
+    yield "predict[rows=1]", lambda: predictor.predict_one(5, 10, 70)
+    for n in sizes['candidates']:
+        yield f"predict[rows={n}]", lambda n=n: predictor.predict(X[:n])
+
+    for n in sizes['candidates']:
+        for jobs in sizes['jobs']:
+            db_path = make_database(os.path.join(workdir, f"bench_{n}_{jobs}.db"), n, jobs, seed)
+            conn = connect(db_path)
+            candidate_skills = [r[0] for r in conn.execute("SELECT skills_list FROM candidates")]
+            job_id, required = conn.execute("SELECT id, skills_required FROM jobs ORDER BY id LIMIT 1").fetchone()
+            engine = load_ranking_engine(conn)
+            png = os.path.join(workdir, 'graph.png')
+            if jobs == sizes['jobs'][0]:
+                yield (f"skill_gap[candidates={n}]",
+                       lambda skills=candidate_skills, required=required: [skill_gap(s, required) for s in skills])
+            yield f"ranking_engine[candidates={n},jobs={jobs}]", lambda conn=conn: load_ranking_engine(conn)
+            yield (f"generate_ranking_graph[candidates={n},jobs={jobs}]",
+                   lambda db_path=db_path, engine=engine, job_id=job_id: generate_ranking_graph(db_path, png, job_id, engine))
+
+def compare(results, baseline, threshold, memory_threshold):
+    # Returns the lines describing each regression against the baseline run
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if (result['median_ms'] > base['median_ms'] * (1 + threshold)
+                and result['median_ms'] - base['median_ms'] > MIN_DELTA_MS):
+            regressions.append(f"{name}: {base['median_ms']:.2f} -> {result['median_ms']:.2f} ms")
+        if (result['peak_kb'] > base['peak_kb'] * (1 + memory_threshold)
+                and result['peak_kb'] - base['peak_kb'] > MIN_DELTA_KB):
+            regressions.append(f"{name}: peak {base['peak_kb']:.0f} -> {result['peak_kb']:.0f} KB")
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ml/ hot paths and leaderboard rendering")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='full')
+    parser.add_argument('--only', default=None, help="run only cases whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, 'bench', 'results', 'latest.json'))
+    parser.add_argument('--compare', default=None, help="baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown of the median, 0.25 = 25%%")
+    parser.add_argument('--memory-threshold', type=float, default=0.10, help="allowed growth of the memory peak")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+        for name, fn in cases(workdir, PROFILES[args.profile], args.seed):
+            if args.only and args.only not in name:
+                continue
+            results[name] = measure(fn, args.repeat)
+            r = results[name]
+            print(f"{name:<52} {r['median_ms']:>10.2f} ms  (min {r['min_ms']:.2f}, {r['runs']} runs)  peak {r['peak_kb']:>9.0f} KB")
+
+    report = {
+        'meta': {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': git_commit(), 'profile': args.profile,
+                 'seed': args.seed, 'python': platform.python_version(), 'machine': platform.platform(),
+                 'numpy': np.__version__},
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold, args.memory_threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regressions against {args.compare} (commit {baseline['meta'].get('commit')})")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import os
+import sys
+import random
+import sqlite3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.generate_data import generate
+from ml.resume_parser import ALL_SKILLS
+from database.db import migrate
+
+# Seeded inputs for the benchmarks: resume text, resume PDFs of any page
+# count and candidate/job databases. The same seed always gives the same
+# bytes, so two runs of a benchmark measure the same work.
+
+SENTENCES = [
+    "Worked as a {role} building {a} services backed by {b}.",
+    "Experienced with {a}, {b} and {c} in production environments.",
+    "Led a team migrating legacy systems to {a} and {b}.",
+    "Skills: {a}, {b}, {c}, {d}.",
+    "Designed data pipelines using {a} with monitoring on {b}.",
+    "Built {role} tooling, automated deployments with {a}.",
+    "Completed coursework in {a} and {b}; final project used {c}.",
+]
+
+ROLES = ["backend engineer", "data scientist", "full stack developer", "devops engineer", "ml engineer"]
+
+FILLER = ("Collaborated with product managers and designers to deliver features on schedule. "
+          "Mentored junior engineers and reviewed code for quality and maintainability. ")
+
+FIRST_NAMES = ["Ada", "Alan", "Grace", "Linus", "Barbara", "Ken", "Margaret", "Dennis", "Frances", "Guido"]
+LAST_NAMES = ["Lovelace", "Turing", "Hopper", "Torvalds", "Liskov", "Thompson", "Hamilton", "Ritchie", "Allen", "Rossum"]
+
+def resume_text(rng, paragraphs=6):
+    parts = []
+    for _ in range(paragraphs):
+        skills = rng.sample(ALL_SKILLS, 4)
+        template = rng.choice(SENTENCES)
+        parts.append(template.format(role=rng.choice(ROLES), a=skills[0], b=skills[1], c=skills[2], d=skills[3]))
+        parts.append(FILLER)
+    return " ".join(parts)
+
+def make_corpus(n, seed=42, paragraphs=6):
+    rng = random.Random(seed)
+    return [resume_text(rng, paragraphs) for _ in range(n)]
+
+# A4-ish page of 10pt Helvetica
+LINES_PER_PAGE = 60
+CHARS_PER_LINE = 95
+
+def _wrap(text, width):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+def _escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def write_resume_pdf(path, pages, seed=42):
+    # Writes a plain text PDF with the given number of full pages. Built by
+    # hand so the benchmarks need nothing beyond pdfplumber to read it back.
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < pages * LINES_PER_PAGE:
+        lines.extend(_wrap(resume_text(rng), CHARS_PER_LINE))
+        lines.append("")
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(pages):
+        page_lines = lines[p * LINES_PER_PAGE:(p + 1) * LINES_PER_PAGE]
+        body = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_escape(l)}) '" for l in page_lines) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode('latin-1')
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    with open(path, 'wb') as f:
+        f.write(out)
+    return path
+
+def make_database(path, candidates, jobs, seed=42):
+    # Candidates take experience, skill counts, quiz scores and labels from
+    # ml/generate_data.py; skill lists, summaries and jobs are drawn from the
+    # skill catalog
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    migrate(path)
+    rng = random.Random(seed)
+    X, y = generate(candidates, seed)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO jobs (title, description, skills_required, min_quiz_score, min_resume_score) VALUES (?, ?, ?, ?, ?)",
+            [(f"{rng.choice(ROLES).title()} #{i + 1}", resume_text(rng, 2),
+              ", ".join(rng.sample(ALL_SKILLS, rng.randint(2, 6))), rng.choice([0, 40, 60, 70]), rng.choice([0, 30, 50]))
+             for i in range(jobs)])
+        conn.executemany(
+            "INSERT INTO candidates (user_id, name, experience, skills, quiz, selected, resume_score, summary, skills_list, resume_match) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(i + 1, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i + 1}", int(X[i, 0]), int(X[i, 1]), float(X[i, 2]),
+              int(y[i]), rng.randint(20, 95), resume_text(rng, 1),
+              ", ".join(sorted(rng.sample(ALL_SKILLS, min(int(X[i, 1]), len(ALL_SKILLS))))), rng.uniform(0, 60))
+             for i in range(candidates)])
+    conn.close()
+    return path
@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import glob
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from ml.resume_parser import extract_resume_text, skills_from_texts, hash_file
+from ml.job_index import get_job_index
+from ml.candidate_index import update_candidate_index
+from ml.candidate_matches import eligible
+from ml.predictor import Predictor
+from database.db import migrate
+
+# Imports a directory of resume PDFs into candidates in bulk. PDFs are parsed
+# in a process pool, skills are extracted through nlp.pipe, every resume is
+# scored against every job in one matrix product and rows are written with
+# executemany, one transaction per batch. Each imported file's SHA-256 is
+# committed with its candidate row, so a crashed run resumes where it stopped.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _parse(path):
+    return path, extract_resume_text(path)
+
+def name_from_path(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return " ".join(stem.replace("_", " ").replace("-", " ").split()).title()
+
+class StageTimer:
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, stage, seconds):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def report(self, count, elapsed):
+        print(f"Imported {count} resumes in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f} resumes/sec)")
+        for stage, seconds in self.totals.items():
+            print(f"  {stage:<8} {seconds:8.2f}s  ({seconds * 1000 / count if count else 0:.1f} ms/resume)")
+
+def run(args):
+    migrate(args.db)
+    conn = sqlite3.connect(args.db, timeout=60)
+
+    paths = sorted(set(glob.glob(os.path.join(args.source, '**', '*.pdf'), recursive=True)))
+    timer = StageTimer()
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        t = time.perf_counter()
+        hashes = list(pool.map(hash_file, paths, chunksize=64))
+        done = {row[0] for row in conn.execute("SELECT sha256 FROM bulk_imports")}
+        todo = []
+        seen = set()
+        for path, digest in zip(paths, hashes):
+            if digest in done or digest in seen:
+                continue
+            seen.add(digest)
+            todo.append((path, digest))
+        timer.add('hash', time.perf_counter() - t)
+        print(f"{len(paths)} PDFs found, {len(paths) - len(todo)} already imported or duplicates, {len(todo)} to import")
+
+        predictor = Predictor(args.model)
+        job_index = get_job_index(args.db)
+        thresholds = {row[0]: row[1:] for row in conn.execute("SELECT id, min_quiz_score, min_resume_score FROM jobs")}
+        # Every imported candidate gets the same quiz and no resume score, so
+        # they all qualify for the same jobs
+        eligible_columns = [(i, job_id) for i, job_id in enumerate(job_index.job_ids)
+                            if job_id in thresholds and eligible(args.quiz, None, *thresholds[job_id])]
+        imported = 0
+
+        for offset in range(0, len(todo), args.batch_size):
+            batch = todo[offset:offset + args.batch_size]
+            digests = {path: digest for path, digest in batch}
+
+            t = time.perf_counter()
+            parsed = list(pool.map(_parse, [path for path, _ in batch], chunksize=max(1, len(batch) // (args.workers * 4))))
+            timer.add('parse', time.perf_counter() - t)
+
+            texts = [text for _, text in parsed]
+            t = time.perf_counter()
+            skills = skills_from_texts(texts)
+            timer.add('skills', time.perf_counter() - t)
+
+            t = time.perf_counter()
+            match = job_index.score_many(texts)
+            max_match = match.max(axis=1) if match.shape[1] else [0.0] * len(texts)
+            timer.add('match', time.perf_counter() - t)
+
+            t = time.perf_counter()
+            features = [[args.experience, count, args.quiz] for count, _ in skills]
+            selected, model_version = predictor.predict(features) if len(texts) else ([], None)
+            timer.add('predict', time.perf_counter() - t)
+
+            t = time.perf_counter()
+            rows = [(args.user_id, name_from_path(path), args.experience, skills[i][0], args.quiz, int(selected[i]),
+                     None, "", skills[i][1], float(max_match[i]), model_version, texts[i])
+                    for i, (path, _) in enumerate(parsed)]
+            now = time.time()
+            with conn:
+                # executemany does not return ids, so they are read back from the
+                # rowid range this transaction just wrote
+                conn.executemany("INSERT INTO candidates (user_id, name, experience, skills, quiz, selected, resume_score, summary, skills_list, resume_match, model_version, resume_text) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                first_id = last_id - len(rows) + 1
+                conn.executemany("INSERT INTO bulk_imports (sha256, path, candidate_id, imported_at) VALUES (?, ?, ?, ?)",
+                                 [(digests[path], path, first_id + i, now) for i, (path, _) in enumerate(parsed)])
+                conn.executemany("INSERT OR REPLACE INTO candidate_job_match (candidate_id, job_id, score) VALUES (?, ?, ?)",
+                                 [(first_id + i, job_id, float(match[i, column]))
+                                  for i in range(len(rows)) for column, job_id in eligible_columns])
+            timer.add('write', time.perf_counter() - t)
+
+            imported += len(rows)
+            elapsed = time.perf_counter() - start
+            print(f"  {imported}/{len(todo)} imported ({imported / elapsed:.1f} resumes/sec)")
+
+    conn.close()
+    timer.report(imported, time.perf_counter() - start)
+    t = time.perf_counter()
+    appended = update_candidate_index(args.db)
+    print(f"Candidate index: {appended} rows appended in {time.perf_counter() - t:.1f}s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import a directory of resume PDFs as candidates")
+    parser.add_argument('source', help="directory searched recursively for *.pdf")
+    parser.add_argument('--db', default=os.path.join(BASE_DIR, 'database', 'candidates.db'))
+    parser.add_argument('--model', default=None, help="exported forest (.npz) or pickled model; defaults to the app's")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--batch-size', type=int, default=500, help="resumes per transaction")
+    parser.add_argument('--experience', type=float, default=0, help="years of experience recorded for every resume")
+    parser.add_argument('--quiz', type=float, default=0, help="quiz score recorded for every resume")
+    parser.add_argument('--user-id', type=int, default=None, help="user the candidates belong to")
+    run(parser.parse_args(argv))
+
+if __name__ == '__main__':
+    sys.exit(main())
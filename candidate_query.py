@@ -0,0 +1,107 @@
+import json
+import base64
+
+# Filtered, keyset-paginated reads of the candidates table for the admin
+# dashboard and /api/candidates. Pages continue from the last row's sort key
+# rather than an OFFSET, so every page costs the same however deep it is.
+
+STATUSES = {'pending': 0, 'approved': 1, 'rejected': 2}
+
+# Sort keys map to the expressions indexed together with id in db.py
+SORTS = {
+    'id': 'id',
+    'quiz': 'quiz',
+    'resume_score': 'COALESCE(resume_score, 0)',
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def parse_filters(args):
+    filters = {}
+    status = (args.get('status') or '').strip().lower()
+    if status in STATUSES:
+        filters['status'] = STATUSES[status]
+    for name in ('min_quiz', 'min_resume'):
+        try:
+            value = float(args.get(name) or '')
+        except ValueError:
+            continue
+        filters[name] = value
+    skill = (args.get('skill') or '').strip().lower()
+    if skill:
+        filters['skill'] = skill
+    return filters
+
+def parse_sort(args):
+    sort = args.get('sort') if args.get('sort') in SORTS else 'id'
+    direction = 'asc' if args.get('dir') == 'asc' else 'desc'
+    return sort, direction
+
+def where_clause(filters):
+    clauses, params = [], []
+    if 'status' in filters:
+        clauses.append("selected = ?")
+        params.append(filters['status'])
+    if 'min_quiz' in filters:
+        clauses.append("quiz >= ?")
+        params.append(filters['min_quiz'])
+    if 'min_resume' in filters:
+        clauses.append("COALESCE(resume_score, 0) >= ?")
+        params.append(filters['min_resume'])
+    if 'skill' in filters:
+        escaped = filters['skill'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        clauses.append("LOWER(skills_list) LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    return clauses, params
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != 2:
+        return None
+    return values
+
+def candidate_page(conn, filters, sort='id', direction='desc', cursor=None, limit=DEFAULT_PAGE_SIZE):
+    # Returns (rows, next_cursor); next_cursor is None on the last page
+    expr = SORTS[sort]
+    op = '<' if direction == 'desc' else '>'
+    clauses, params = where_clause(filters)
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        if sort == 'id':
+            clauses.append(f"id {op} ?")
+            params.append(after[1])
+        else:
+            # Ties on the sort key are broken by id. The leading inclusive bound
+            # lets SQLite seek the (key, id) index instead of scanning it.
+            clauses.append(f"{expr} {op}= ? AND ({expr} {op} ? OR id {op} ?)")
+            params.extend([after[0], after[0], after[1]])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = f"id {direction.upper()}" if sort == 'id' else f"{expr} {direction.upper()}, id {direction.upper()}"
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    # One extra row tells whether there is a next page
+    rows = conn.execute(f"SELECT * FROM candidates {where} ORDER BY {order} LIMIT ?", params + [limit + 1]).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        key = {'id': last[0], 'quiz': last[5], 'resume_score': last[7] or 0}[sort]
+        next_cursor = encode_cursor([key, last[0]])
+    return rows, next_cursor
+
+def status_counts(conn):
+    # Read from the trigger-maintained aggregates, not the candidates table
+    counts = dict(conn.execute("SELECT selected, SUM(n) FROM candidate_stats GROUP BY selected").fetchall())
+    return {'total': sum(counts.values()), 'approved': counts.get(1, 0),
+            'pending': counts.get(0, 0), 'rejected': counts.get(2, 0)}
+
+def candidate_json(row):
+    return {'id': row[0], 'user_id': row[1], 'name': row[2], 'experience': row[3], 'skills': row[4],
+            'quiz': row[5], 'selected': row[6], 'resume_score': row[7], 'summary': row[8],
+            'skills_list': row[9], 'resume_match': row[10]}
@@ -0,0 +1,340 @@
+import os
+import time
+import sqlite3
+import threading
+
+# One SQLite connection per thread and database file, reused across requests.
+# The schema is brought up to date by numbered migrations tracked in
+# PRAGMA user_version, so older databases are upgraded in place.
+
+PRAGMAS = [
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=134217728",
+]
+
+_local = threading.local()
+
+# Called as query_observer(sql, seconds) after every statement when set (the
+# app installs metrics.observe_query). For a SELECT the time runs until its
+# first row is ready; fetching the rest is not included.
+query_observer = None
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        if query_observer is None:
+            return sqlite3.Cursor.execute(self, sql, parameters)
+        start = time.perf_counter()
+        try:
+            return sqlite3.Cursor.execute(self, sql, parameters)
+        finally:
+            query_observer(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        if query_observer is None:
+            return sqlite3.Cursor.executemany(self, sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return sqlite3.Cursor.executemany(self, sql, seq_of_parameters)
+        finally:
+            query_observer(sql, time.perf_counter() - start)
+
+class PooledConnection(sqlite3.Connection):
+    # Callers keep the open/close pattern; close() only ends any transaction
+    # left open so the next user of this thread's connection starts clean.
+    def cursor(self, factory=TimedCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def really_close(self):
+        sqlite3.Connection.close(self)
+
+def connect(db_path):
+    pool = getattr(_local, 'connections', None)
+    # A forked worker inherits the parent's thread-local pool; SQLite
+    # connections must not cross a fork, so the child opens its own
+    if pool is None or _local.pid != os.getpid():
+        pool = _local.connections = {}
+        _local.pid = os.getpid()
+    conn = pool.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30, factory=PooledConnection)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        pool[db_path] = conn
+    return conn
+
+def close_all():
+    if getattr(_local, 'pid', None) == os.getpid():
+        for conn in _local.connections.values():
+            conn.really_close()
+    _local.connections = {}
+    _local.pid = os.getpid()
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _add_columns(conn, table, columns):
+    existing = _columns(conn, table)
+    for name, decl in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+def _base_schema(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT,
+        is_admin INTEGER
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS candidates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        name TEXT,
+        experience REAL,
+        skills REAL,
+        quiz REAL,
+        selected INTEGER,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''')
+    # Columns app.py has always written but init_db.py never created
+    _add_columns(conn, 'candidates', [('resume_score', 'REAL'), ('summary', 'TEXT'),
+                                      ('skills_list', 'TEXT'), ('resume_match', 'REAL')])
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        description TEXT,
+        skills_required TEXT,
+        min_quiz_score REAL,
+        min_resume_score REAL
+    )
+    ''')
+
+def _candidate_indexes(conn):
+    # "latest application of this user" and the status filters on the dashboards
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_user_id ON candidates(user_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_selected ON candidates(selected)")
+
+def _candidate_sort_indexes(conn):
+    # Keyset pagination on the dashboard: every sort key is indexed with id
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_quiz ON candidates(quiz, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_resume_score ON candidates(COALESCE(resume_score, 0), id)")
+
+# Aggregates for /admin/analytics, one row per (status, whole quiz score,
+# whole resume score). Triggers keep it current on every write to candidates.
+STATS_BUCKETS = """
+    COALESCE({row}.selected, 0), CAST(COALESCE({row}.quiz, 0) AS INTEGER),
+    CAST(COALESCE({row}.resume_score, 0) AS INTEGER)
+"""
+
+def _stats_add(row):
+    return f"""
+    INSERT INTO candidate_stats (selected, quiz_bucket, resume_bucket, n, quiz_sum, resume_sum)
+    VALUES ({STATS_BUCKETS.format(row=row)}, 1, COALESCE({row}.quiz, 0), COALESCE({row}.resume_score, 0))
+    ON CONFLICT (selected, quiz_bucket, resume_bucket) DO UPDATE SET
+        n = n + 1, quiz_sum = quiz_sum + excluded.quiz_sum, resume_sum = resume_sum + excluded.resume_sum;
+    """
+
+def _stats_remove(row):
+    return f"""
+    UPDATE candidate_stats SET n = n - 1, quiz_sum = quiz_sum - COALESCE({row}.quiz, 0),
+        resume_sum = resume_sum - COALESCE({row}.resume_score, 0)
+    WHERE (selected, quiz_bucket, resume_bucket) = ({STATS_BUCKETS.format(row=row)});
+    """
+
+def rebuild_candidate_stats(conn):
+    conn.execute("DELETE FROM candidate_stats")
+    conn.execute(f"""
+    INSERT INTO candidate_stats (selected, quiz_bucket, resume_bucket, n, quiz_sum, resume_sum)
+    SELECT {STATS_BUCKETS.format(row='candidates')}, COUNT(*), SUM(COALESCE(quiz, 0)), SUM(COALESCE(resume_score, 0))
+    FROM candidates GROUP BY 1, 2, 3
+    """)
+
+def _candidate_stats(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS candidate_stats (
+        selected INTEGER,
+        quiz_bucket INTEGER,
+        resume_bucket INTEGER,
+        n INTEGER,
+        quiz_sum REAL,
+        resume_sum REAL,
+        PRIMARY KEY (selected, quiz_bucket, resume_bucket)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS candidate_stats_insert AFTER INSERT ON candidates BEGIN {_stats_add('NEW')} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS candidate_stats_delete AFTER DELETE ON candidates BEGIN {_stats_remove('OLD')} END")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS candidate_stats_update AFTER UPDATE OF selected, quiz, resume_score ON candidates
+                     BEGIN {_stats_remove('OLD')} {_stats_add('NEW')} END""")
+    rebuild_candidate_stats(conn)
+
+def _job_threshold_index(conn):
+    # Eligible jobs for a candidate are a range scan over both thresholds
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_thresholds ON jobs(min_quiz_score, min_resume_score)")
+
+def _candidate_model_version(conn):
+    # Which selection model produced the stored prediction
+    _add_columns(conn, 'candidates', [('model_version', 'TEXT')])
+
+def _candidate_reviewed_at(conn):
+    # Set when an admin approves or rejects; only these rows are training
+    # labels, since selected = 1 may also be the model's own prediction
+    _add_columns(conn, 'candidates', [('reviewed_at', 'TIMESTAMP')])
+
+def _candidate_resume_text(conn):
+    # Extracted resume text, the source of the candidate vector index
+    _add_columns(conn, 'candidates', [('resume_text', 'TEXT')])
+
+def _candidate_job_match(conn):
+    # Resume/job similarity for each job a candidate meets the thresholds of.
+    # Written when either side is added; see ml/candidate_matches.py
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS candidate_job_match (
+        candidate_id INTEGER NOT NULL,
+        job_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (candidate_id, job_id)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidate_job_match_job ON candidate_job_match(job_id, score)")
+    conn.execute("CREATE TRIGGER IF NOT EXISTS candidate_job_match_delete AFTER DELETE ON candidates BEGIN DELETE FROM candidate_job_match WHERE candidate_id = OLD.id; END")
+
+def _tasks(conn):
+    # Background task state for task_queue.py
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id TEXT PRIMARY KEY,
+        kind TEXT,
+        payload TEXT,
+        status TEXT,
+        result TEXT,
+        error TEXT,
+        created_at REAL,
+        started_at REAL,
+        finished_at REAL
+    )
+    ''')
+
+def _llm_cache(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        kind TEXT,
+        model TEXT,
+        response TEXT,
+        created_at REAL,
+        last_used REAL,
+        hits INTEGER DEFAULT 0
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_kind ON llm_cache(kind)")
+
+def _quiz_bank(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS quiz_bank (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        skill TEXT,
+        exp_bucket TEXT,
+        question TEXT,
+        options TEXT,
+        answer TEXT,
+        created_at REAL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_quiz_bank_skill_bucket ON quiz_bank(exp_bucket, skill)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_quiz_bank_unique ON quiz_bank(skill, exp_bucket, question)")
+    # Only one process fills the bank at a time; the lease expires if it dies
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS quiz_bank_lease (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        owner TEXT,
+        expires_at REAL
+    )
+    ''')
+
+def _bulk_imports(conn):
+    # Resumes bulk_import.py has already imported, by file hash
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS bulk_imports (
+        sha256 TEXT PRIMARY KEY,
+        path TEXT,
+        candidate_id INTEGER,
+        imported_at REAL
+    )
+    ''')
+
+def _task_leases(conn):
+    # The process running a task and until when its claim holds; it renews
+    # the lease while alive, so only tasks of dead processes are recovered
+    _add_columns(conn, 'tasks', [('owner', 'TEXT'), ('lease_until', 'REAL')])
+
+def _meta(conn):
+    # A random token created with the database, so files derived from it
+    # (the candidate index) can tell a recreated database from the one they
+    # were built from even when ids start over
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('token', lower(hex(randomblob(16))))")
+
+# Append only: each entry runs once, in order, and its position is the version
+MIGRATIONS = [
+    _base_schema,
+    _candidate_indexes,
+    _candidate_sort_indexes,
+    _candidate_stats,
+    _job_threshold_index,
+    _candidate_model_version,
+    _candidate_reviewed_at,
+    _candidate_resume_text,
+    _candidate_job_match,
+    # Tables the modules using them used to create on startup; IF NOT EXISTS
+    # keeps these no-ops on databases that already have them
+    _tasks,
+    _llm_cache,
+    _quiz_bank,
+    _bulk_imports,
+    _task_leases,
+    _meta,
+]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def db_token(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'token'").fetchone()
+    return row[0] if row else None
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("BEGIN IMMEDIATE")
+        version = schema_version(conn)
+        for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            step(conn)
+            conn.execute(f"PRAGMA user_version={number}")
+        conn.commit()
+        return schema_version(conn)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    import os
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'candidates.db')
+    print(f"Schema at version {migrate(path)}")
@@ -1,35 +1,25 @@
 import sqlite3
 import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.db import migrate
+from ml.candidate_index import index_dir
 
 db_path = os.path.join(os.path.dirname(__file__), 'candidates.db')
-if os.path.exists(db_path):
-    os.remove(db_path)
+for path in (db_path, db_path + '-wal', db_path + '-shm'):
+    if os.path.exists(path):
+        os.remove(path)
+# The candidate index holds rows of the old database under ids the new one will reuse
+shutil.rmtree(index_dir(db_path), ignore_errors=True)
+
+# Tables, columns and indexes all come from the migrations in db.py
+migrate(db_path)
 
 conn = sqlite3.connect(db_path)
 c = conn.cursor()
 
-c.execute('''
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE,
-    password TEXT,
-    is_admin INTEGER
-)
-''')
-
-c.execute('''
-CREATE TABLE IF NOT EXISTS candidates (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER,
-    name TEXT,
-    experience REAL,
-    skills REAL,
-    quiz REAL,
-    selected INTEGER,
-    FOREIGN KEY(user_id) REFERENCES users(id)
-)
-''')
-
 # Create admin user
 c.execute("INSERT INTO users (username, password, is_admin) VALUES ('admin', 'admin', 1)")
 
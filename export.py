@@ -0,0 +1,114 @@
+import io
+import csv
+import zlib
+from candidate_query import where_clause
+
+# Candidate exports are streamed: rows are read in id-ordered chunks and each
+# chunk is encoded and sent before the next is read, so memory stays flat
+# however large the table is.
+
+COLUMNS = ['id', 'user_id', 'name', 'experience', 'skills', 'quiz', 'selected',
+           'resume_score', 'summary', 'skills_list', 'resume_match']
+
+INTEGER_COLUMNS = {'id', 'user_id', 'selected'}
+TEXT_COLUMNS = {'name', 'summary', 'skills_list'}
+
+CHUNK_SIZE = 5000
+
+def parse_columns(arg):
+    # Unknown names are dropped; nothing valid means every column
+    if not arg:
+        return list(COLUMNS)
+    wanted = {c.strip() for c in arg.split(',')}
+    columns = [c for c in COLUMNS if c in wanted]
+    return columns or list(COLUMNS)
+
+def iter_chunks(conn, columns, filters, chunk_size=CHUNK_SIZE):
+    # Each chunk is its own short query continuing after the last id, so no
+    # read transaction stays open while the client downloads
+    select = ', '.join(['id'] + columns)
+    clauses, params = where_clause(filters)
+    last_id = 0
+    while True:
+        where = ' AND '.join(clauses + ['id > ?'])
+        rows = conn.execute(f"SELECT {select} FROM candidates WHERE {where} ORDER BY id LIMIT ?",
+                            params + [last_id, chunk_size]).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [row[1:] for row in rows]
+        if len(rows) < chunk_size:
+            return
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def csv_stream(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+class _Sink(io.RawIOBase):
+    # Write-only file handed to ParquetWriter; bytes are drained after each row group
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+def parquet_schema(columns):
+    import pyarrow as pa
+    types = {c: pa.int64() if c in INTEGER_COLUMNS else pa.string() if c in TEXT_COLUMNS else pa.float64()
+             for c in columns}
+    return pa.schema([(c, types[c]) for c in columns])
+
+def parquet_stream(chunks, columns):
+    # One row group per chunk; the footer is written when the last one is done
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = parquet_schema(columns)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in chunks:
+            arrays = [pa.array([row[i] for row in rows], type=schema.field(i).type) for i in range(len(columns))]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def parquet_available():
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        return False
+    return True
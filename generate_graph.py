@@ -1,60 +1,47 @@
-import sqlite3
-import pandas as pd
-from ml.resume_parser import match_resume
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import os
+from ml.ranking import get_ranking_engine
+from startup import stage
+from metrics import timed
 
-def generate_ranking_graph(db_path, output_path, job_id=None):
-    conn = sqlite3.connect(db_path)
-    
-    # Extract candidate metrics
-    query = "SELECT name, skills, quiz, experience, summary FROM candidates"
-    
+_plt = None
+
+def load_pyplot():
+    # pyplot takes half a second to import, so it is loaded for the first graph
+    global _plt
+    if _plt is None:
+        with stage('matplotlib'):
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+        _plt = plt
+    return _plt
+
+# Leaderboard PNGs show the best candidates only; the full list is in the JSON API
+GRAPH_TOP_K = 15
+
+@timed('graph.render')
+def generate_ranking_graph(db_path, output_path, job_id=None, engine=None):
     try:
-        df = pd.read_sql_query(query, conn)
-        
-        job_desc = ""
-        if job_id is not None:
-            job_query = f"SELECT description, skills_required FROM jobs WHERE id={job_id}"
-            job_row = pd.read_sql_query(job_query, conn)
-            if not job_row.empty:
-                job_desc = f"{job_row['description'].iloc[0]} {job_row['skills_required'].iloc[0]}"
-                
+        if engine is None:
+            engine = get_ranking_engine(db_path)
     except Exception as e:
         print("Error reading from db:", e)
-        conn.close()
         return False
-        
-    conn.close()
     
-    if df.empty:
+    leaderboard = engine.top_k(job_id, GRAPH_TOP_K)
+    if not leaderboard:
         return False
 
-    if job_id is not None and job_desc:
-        # Calculate dynamic TF-IDF against this specific job
-        df['resume_match'] = df['summary'].fillna("").apply(lambda x: match_resume(x, job_desc))
-    else:
-        # Fallback if no specific job, just use their existing skills string as a weak generic match
-        df['resume_match'] = df['summary'].fillna("").apply(lambda x: match_resume(x, "software engineering machine learning nlp web application"))
-    
-    # Normalize skills and experience if needed (making out of 100 roughly)
-    df['exp_norm'] = df['experience'].apply(lambda x: min(100, float(x) * 10))
-    df['skills_norm'] = df['skills'].apply(lambda x: min(100, float(x) * 10))
-    df['quiz'] = df['quiz'].fillna(0)
-    
-    # Weighted final score: 40% resume, 30% quiz, 20% skills, 10% experience
-    df['final_score'] = (0.40 * df['resume_match']) + (0.30 * df['quiz']) + (0.20 * df['skills_norm']) + (0.10 * df['exp_norm'])
-    
-    df = df.groupby('name')['final_score'].max().reset_index()
-    df = df.sort_values(by='final_score', ascending=True)
+    # Lowest first so the best candidate ends up at the top of the bar chart
+    leaderboard.reverse()
+    names = [row['name'] for row in leaderboard]
+    final_scores = [row['final_score'] for row in leaderboard]
     
+    plt = load_pyplot()
     plt.figure(figsize=(10, 5))
     ax = plt.gca()
     
     # Build bars
-    bars = plt.barh(df['name'], df['final_score'], color='#818cf8', height=0.6)
+    bars = plt.barh(names, final_scores, color='#818cf8', height=0.6)
     
     # Formats
     title_text = f'Candidate Leaderboard (Job #{job_id})' if job_id else 'Overall Candidate Leaderboard'
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import queue
+import hashlib
+import threading
+from generate_graph import generate_ranking_graph
+from database.db import connect
+
+GLOBAL_KEY = 'global'
+
+# pyplot keeps global figure state, so renders never overlap across threads
+_render_lock = threading.Lock()
+
+def graph_filename(key):
+    return 'ranking.png' if key == GLOBAL_KEY else f'ranking_job_{key}.png'
+
+def graph_fingerprint(candidate_count, max_candidate_id, jobs_signature, job_row=None):
+    # Candidates are only ever inserted, so count + max id changes whenever the
+    # leaderboard input does; the job row covers edits to the job itself.
+    # Scores come from one TF-IDF fit over all job documents, so any job added
+    # or removed (jobs count + max id) changes every graph, the global one too.
+    payload = json.dumps([candidate_count, max_candidate_id, list(jobs_signature),
+                          list(job_row) if job_row else None], default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class GraphCache:
+    def __init__(self, db_path, static_dir, manifest_path, background=True):
+        self.db_path = db_path
+        self.static_dir = static_dir
+        self.manifest_path = manifest_path
+        self.background = background
+        self.lock = threading.Lock()
+        self.manifest = {}
+        self.manifest_mtime = None
+        self.stats = {'hits': 0, 'misses': 0, 'renders': 0, 'stale_served': 0, 'render_seconds': 0.0}
+        self.pending = set()
+        self.queue = queue.Queue()
+        self.worker = None
+
+    def _load_manifest(self):
+        # Other workers write the same manifest, so reread it when it changes on disk
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            return
+        if mtime == self.manifest_mtime:
+            return
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            self.manifest_mtime = mtime
+        except (OSError, ValueError) as e:
+            print("Failed to read graph cache manifest:", e)
+
+    def _save_manifest(self):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp_path, self.manifest_path)
+            self.manifest_mtime = os.path.getmtime(self.manifest_path)
+        except OSError as e:
+            print("Failed to write graph cache manifest:", e)
+
+    def _render(self, key, fingerprint):
+        filename = graph_filename(key)
+        output_path = os.path.join(self.static_dir, filename)
+        # Render next to the target and swap it in, so a request never sees a half-written PNG
+        tmp_path = os.path.join(self.static_dir, f'.{filename[:-4]}.{os.getpid()}.tmp.png')
+        start = time.perf_counter()
+        try:
+            with _render_lock:
+                ok = generate_ranking_graph(self.db_path, tmp_path, job_id=None if key == GLOBAL_KEY else key)
+            if ok:
+                os.replace(tmp_path, output_path)
+        except Exception as e:
+            print(f"Graph render error ({filename}):", e)
+            ok = False
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.stats['renders'] += 1
+            self.stats['render_seconds'] += elapsed
+            self._load_manifest()
+            self.manifest[str(key)] = {'fingerprint': fingerprint, 'ok': ok, 'rendered_at': time.time()}
+            self._save_manifest()
+            self.pending.discard(str(key))
+        return ok
+
+    def _work(self):
+        while True:
+            key, fingerprint = self.queue.get()
+            try:
+                self._render(key, fingerprint)
+            finally:
+                self.queue.task_done()
+
+    def _enqueue(self, key, fingerprint):
+        if str(key) in self.pending:
+            return
+        self.pending.add(str(key))
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._work, name='graph-cache', daemon=True)
+            self.worker.start()
+        self.queue.put((key, fingerprint))
+
+    def get_graphs(self, jobs):
+        # jobs: rows from "SELECT * FROM jobs"; returns the graphs to show, global first
+        conn = connect(self.db_path)
+        try:
+            candidate_count, max_candidate_id = conn.execute("SELECT COUNT(*), MAX(id) FROM candidates").fetchone()
+            jobs_signature = conn.execute("SELECT COUNT(*), MAX(id) FROM jobs").fetchone()
+        finally:
+            conn.close()
+
+        targets = [(GLOBAL_KEY, 'Overall Macro Leaderboard', graph_fingerprint(candidate_count, max_candidate_id, jobs_signature))]
+        for job in jobs:
+            targets.append((job[0], job[1], graph_fingerprint(candidate_count, max_candidate_id, jobs_signature, job)))
+
+        graphs = []
+        for key, title, fingerprint in targets:
+            filename = graph_filename(key)
+            has_file = os.path.exists(os.path.join(self.static_dir, filename))
+            with self.lock:
+                self._load_manifest()
+                entry = self.manifest.get(str(key))
+                fresh = entry is not None and entry['fingerprint'] == fingerprint and (has_file or not entry['ok'])
+                version = fingerprint
+                if fresh:
+                    self.stats['hits'] += 1
+                    ok = entry['ok']
+                else:
+                    self.stats['misses'] += 1
+                    serve_stale = self.background and entry is not None and entry['ok'] and has_file
+                    if serve_stale:
+                        self.stats['stale_served'] += 1
+                        self._enqueue(key, fingerprint)
+                        ok = True
+                        # Version the URL by what is on disk so browsers refetch once it is redrawn
+                        version = entry['fingerprint']
+            if not fresh and not serve_stale:
+                ok = self._render(key, fingerprint)
+            if ok:
+                graphs.append({'id': key, 'title': title, 'filename': filename, 'version': version[:12]})
+        return graphs
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self.pending)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['render_seconds'] = round(stats['render_seconds'], 3)
+        return stats
@@ -0,0 +1,119 @@
+import re
+import time
+import hashlib
+import threading
+from database.db import connect
+
+# Completed LLM responses, keyed by a hash of the normalized prompt and the
+# model name. Entries expire after a per-kind TTL and the least recently used
+# ones are evicted once the table grows past max_entries.
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# A TTL of 0 disables caching for that kind of call
+DEFAULT_TTLS = {
+    'evaluate_resume': 7 * DAY,
+    'generate_quiz_questions': DAY,
+    'career_ai': 6 * HOUR,
+    'chat': 0,
+}
+
+def normalize_prompt(prompt):
+    return re.sub(r'\s+', ' ', prompt).strip().lower()
+
+def cache_key(kind, model, prompt):
+    return hashlib.sha256(f"{kind}\0{model}\0{normalize_prompt(prompt)}".encode('utf-8')).hexdigest()
+
+class LLMCache:
+    def __init__(self, db_path, ttls=None, max_entries=5000):
+        self.db_path = db_path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.puts_since_evict = 0
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _count(self, kind, name):
+        with self.lock:
+            counts = self.counters.setdefault(kind, {'hits': 0, 'misses': 0, 'stores': 0})
+            counts[name] += 1
+
+    def enabled(self, kind):
+        return self.ttls.get(kind, 0) > 0
+
+    def get(self, kind, model, prompt):
+        if not self.enabled(kind):
+            return None
+        key = cache_key(kind, model, prompt)
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key=?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttls[kind]:
+                if row is not None:
+                    conn.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+                    conn.commit()
+                self._count(kind, 'misses')
+                return None
+            conn.execute("UPDATE llm_cache SET last_used=?, hits=hits+1 WHERE key=?", (now, key))
+            conn.commit()
+        finally:
+            conn.close()
+        self._count(kind, 'hits')
+        return row[0]
+
+    def put(self, kind, model, prompt, response):
+        if not self.enabled(kind):
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("INSERT OR REPLACE INTO llm_cache (key, kind, model, response, created_at, last_used, hits) VALUES (?, ?, ?, ?, ?, ?, 0)",
+                         (cache_key(kind, model, prompt), kind, model, response, now, now))
+            conn.commit()
+            with self.lock:
+                self.puts_since_evict += 1
+                check = self.puts_since_evict >= 50
+                if check:
+                    self.puts_since_evict = 0
+            if check:
+                self._evict(conn)
+        finally:
+            conn.close()
+        self._count(kind, 'stores')
+
+    def _evict(self, conn):
+        count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Trim to 90% so eviction does not run again on the very next insert
+        excess = count - int(self.max_entries * 0.9)
+        conn.execute("DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)", (excess,))
+        conn.commit()
+
+    def invalidate(self, kind=None):
+        conn = self._connect()
+        if kind is None:
+            conn.execute("DELETE FROM llm_cache")
+        else:
+            conn.execute("DELETE FROM llm_cache WHERE kind=?", (kind,))
+        conn.commit()
+        conn.close()
+
+    def stats(self):
+        with self.lock:
+            counters = {kind: dict(c) for kind, c in self.counters.items()}
+        conn = self._connect()
+        entries = dict(conn.execute("SELECT kind, COUNT(*) FROM llm_cache GROUP BY kind").fetchall())
+        conn.close()
+        stats = {}
+        for kind in set(counters) | set(entries) | {k for k in self.ttls if self.enabled(k)}:
+            c = counters.get(kind, {'hits': 0, 'misses': 0, 'stores': 0})
+            lookups = c['hits'] + c['misses']
+            stats[kind] = dict(c, entries=entries.get(kind, 0), ttl_seconds=self.ttls.get(kind, 0),
+                               hit_rate=round(c['hits'] / lookups, 3) if lookups else 0.0)
+        return stats
@@ -0,0 +1,194 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench.fixtures import write_resume_pdf, FIRST_NAMES
+
+# Drives a running app the way its users do. Candidates register, apply with a
+# resume PDF, wait for the quiz, answer it, open their dashboard, ask the
+# chatbot and stream the career analysis; admins browse the dashboard,
+# candidate API and analytics meanwhile. Each concurrency level runs for a
+# fixed time and reports p50/p95/p99 and throughput per route, which shows
+# where SQLite locking or the LLM starts to dominate.
+#
+#   python loadtest/fake_ollama.py --port 11555 &
+#   OLLAMA_URL=http://127.0.0.1:11555 python app.py &
+#   python loadtest/driver.py --levels 1,4,16,32 --duration 30
+
+CHAT_MESSAGES = [
+    "Which skill should I learn next?",
+    "How do I prepare for the technical interview?",
+    "Is my experience enough for a backend role?",
+    "What projects would make my resume stronger?",
+]
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, route, seconds, ok=True):
+        with self.lock:
+            self.samples.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+class Stop(Exception):
+    pass
+
+class User:
+    def __init__(self, args, recorder, deadline):
+        self.args = args
+        self.base_url = args.base_url.rstrip('/')
+        self.recorder = recorder
+        self.deadline = deadline
+        self.timeout = args.timeout
+        self.session = requests.Session()
+
+    def request(self, method, path, route=None, stream=False, **kwargs):
+        # Redirects are not followed, so each route is timed on its own
+        if time.monotonic() > self.deadline:
+            raise Stop()
+        route = route or f"{method} {path.split('?')[0]}"
+        start = time.perf_counter()
+        try:
+            r = self.session.request(method, self.base_url + path, allow_redirects=False,
+                                     timeout=self.timeout, stream=stream, **kwargs)
+            if stream:
+                chunks = r.iter_content(chunk_size=None)
+                next(chunks, None)
+                self.recorder.add(f"{route} [first byte]", time.perf_counter() - start, r.status_code < 400)
+                for _ in chunks:
+                    pass
+            else:
+                r.content
+        except requests.RequestException:
+            self.recorder.add(route, time.perf_counter() - start, ok=False)
+            return None
+        self.recorder.add(route, time.perf_counter() - start, r.status_code < 400)
+        return r
+
+class Candidate(User):
+    def run(self, number, pdfs, rng):
+        username = f"load_{os.getpid()}_{number}_{rng.randrange(10**9)}"
+        self.request('POST', '/register', data={'username': username, 'password': 'load'})
+        self.request('POST', '/login', data={'username': username, 'password': 'load'})
+        with open(rng.choice(pdfs), 'rb') as f:
+            self.request('POST', '/apply', data={'name': f"{rng.choice(FIRST_NAMES)} {number}", 'exp': str(rng.randint(0, 15))},
+                         files={'resume': (f"{username}.pdf", f, 'application/pdf')})
+        # Polls like the quiz page does
+        for _ in range(30):
+            status = self.request('GET', '/api/apply/status')
+            if status is None or status.status_code != 200 or status.json().get('ready'):
+                break
+            time.sleep(2)
+        page = self.request('GET', '/quiz')
+        answers = {}
+        if page is not None:
+            options = {}
+            for name, value in re.findall(r'name="(answer_\d+)" value="([^"]*)"', page.text):
+                options.setdefault(name, []).append(value)
+            answers = {name: rng.choice(values) for name, values in options.items()}
+        self.request('POST', '/quiz', data=answers)
+        self.request('GET', '/user_dashboard')
+        self.request('POST', '/api/chat', json={'message': rng.choice(CHAT_MESSAGES)})
+        self.request('POST', '/career_ai/stream', stream=True)
+
+class Admin(User):
+    def run(self, number, pdfs, rng):
+        if number == 0:
+            self.request('POST', '/login', data={'username': self.args.admin_user, 'password': self.args.admin_password})
+        self.request('GET', '/dashboard')
+        self.request('GET', '/api/candidates?status=pending&sort=quiz&limit=50')
+        self.request('GET', '/admin/analytics')
+
+def worker(cls, args, recorder, deadline, pdfs, seed):
+    rng = random.Random(seed)
+    user = cls(args, recorder, deadline)
+    number = 0
+    try:
+        while time.monotonic() < deadline:
+            if cls is Candidate:
+                # A fresh session per application, like a new visitor
+                user.session = requests.Session()
+            user.run(number, pdfs, rng)
+            number += 1
+    except Stop:
+        pass
+
+def run_level(concurrency, args, pdfs):
+    admins = round(concurrency * args.admin_share)
+    candidates = max(concurrency - admins, 1)
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=worker, args=(Candidate, args, recorder, deadline, pdfs, args.seed + i))
+               for i in range(candidates)]
+    threads += [threading.Thread(target=worker, args=(Admin, args, recorder, deadline, pdfs, args.seed + 1000 + i))
+                for i in range(admins)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        ms = np.array(samples) * 1000
+        routes[route] = {
+            'count': len(samples),
+            'errors': recorder.errors.get(route, 0),
+            'rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(float(np.percentile(ms, 50)), 1),
+            'p95_ms': round(float(np.percentile(ms, 95)), 1),
+            'p99_ms': round(float(np.percentile(ms, 99)), 1),
+        }
+    return {'concurrency': concurrency, 'candidates': candidates, 'admins': admins,
+            'seconds': round(elapsed, 1), 'routes': routes}
+
+def print_level(level):
+    print(f"\n== {level['concurrency']} users ({level['candidates']} candidates, {level['admins']} admins), {level['seconds']}s")
+    print(f"{'route':<42} {'count':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, r in level['routes'].items():
+        print(f"{route:<42} {r['count']:>6} {r['errors']:>6} {r['rps']:>7.2f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test of the running app")
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--levels', default='1,4,16', help="comma separated numbers of concurrent users")
+    parser.add_argument('--duration', type=float, default=30, help="seconds per level")
+    parser.add_argument('--admin-share', type=float, default=0.25, help="share of users that are admins")
+    parser.add_argument('--admin-user', default='admin')
+    parser.add_argument('--admin-password', default='admin')
+    parser.add_argument('--pdfs', type=int, default=20, help="distinct resumes to upload")
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    levels = []
+    with tempfile.TemporaryDirectory(prefix='loadtest-') as workdir:
+        pdfs = [write_resume_pdf(os.path.join(workdir, f"resume_{i}.pdf"), 1 + i % 3, args.seed + i)
+                for i in range(args.pdfs)]
+        for concurrency in [int(n) for n in args.levels.split(',')]:
+            level = run_level(concurrency, args, pdfs)
+            print_level(level)
+            levels.append(level)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'base_url': args.base_url, 'duration': args.duration, 'levels': levels}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
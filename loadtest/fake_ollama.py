@@ -0,0 +1,158 @@
+import re
+import zlib
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Stand-in for Ollama's /api/generate for load tests. Answers are shaped for
+# the prompts the app sends (resume scores, quiz JSON, career advice) so every
+# code path behind the LLM runs, with configurable latency, failures and
+# token-by-token streaming.
+#
+#   python loadtest/fake_ollama.py --port 11555 --latency 0.8 --failure-rate 0.02
+#   OLLAMA_URL=http://127.0.0.1:11555 python app.py
+
+ADVICE = ("Focus on the skills the listed jobs ask for most. Build one small project with docker and "
+          "kubernetes, write tests for it, and describe the measurable results on your resume.")
+
+TOPICS = ["data structures", "databases", "networking", "testing", "concurrency", "security", "design"]
+
+class Config:
+    def __init__(self, latency=0.5, jitter=0.2, token_delay=0.02, failure_rate=0.0, hang_rate=0.0, hang_seconds=60, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'streams': 0, 'failures': 0, 'hangs': 0}
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def draw(self):
+        with self.lock:
+            return self.random.random(), self.random.uniform(-self.jitter, self.jitter)
+
+def quiz_response(prompt):
+    match = re.search(r'exactly (\d+)', prompt)
+    n = int(match.group(1)) if match else 5
+    questions = []
+    for i in range(n):
+        topic = TOPICS[(zlib.crc32(prompt.encode()) + i) % len(TOPICS)]
+        options = [f"{topic} answer {j}" for j in range(4)]
+        questions.append({'question': f"Question {i + 1} about {topic}?", 'options': options, 'answer': options[i % 4]})
+    return json.dumps(questions)
+
+def respond(prompt):
+    if 'multiple choice' in prompt:
+        return quiz_response(prompt)
+    if prompt.startswith('Evaluate the following resume'):
+        score = 40 + zlib.crc32(prompt.encode()) % 55
+        return f"Score: {score}\nSummary: Solid fundamentals with room to show more production experience."
+    return ADVICE
+
+class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the app's pooled keep-alive connections are reused
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def handle(self):
+        # Pooled client connections are dropped whenever the app likes
+        try:
+            super().handle()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path != '/api/generate':
+            return self._send(404, {'error': 'not found'})
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._send(400, {'error': 'invalid json'})
+        config = self.config
+        config.count('requests')
+        roll, jitter = config.draw()
+        if roll < config.failure_rate:
+            config.count('failures')
+            return self._send(500, {'error': 'simulated failure'})
+        if roll < config.failure_rate + config.hang_rate:
+            # Longer than the app's read timeout, so the call times out
+            config.count('hangs')
+            time.sleep(config.hang_seconds)
+            return self._send(200, {'response': '', 'done': True})
+        time.sleep(max(config.latency + jitter, 0))
+        text = respond(payload.get('prompt', ''))
+        if payload.get('stream'):
+            config.count('streams')
+            return self._stream(payload.get('model'), text)
+        self._send(200, {'model': payload.get('model'), 'response': text, 'done': True})
+
+    def _send(self, status, obj):
+        data = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model, text):
+        # NDJSON over chunked transfer encoding, one chunk per token like Ollama
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for token in re.findall(r'\S+\s*', text):
+                self._chunk({'model': model, 'response': token, 'done': False})
+                time.sleep(self.config.token_delay)
+            self._chunk({'model': model, 'response': '', 'done': True})
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # The app closed the stream because its client went away
+            self.close_connection = True
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + '\n').encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11555)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds before the response or first token")
+    parser.add_argument('--jitter', type=float, default=0.2, help="latency varies uniformly by +- this much")
+    parser.add_argument('--token-delay', type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="share of requests answered with HTTP 500")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="share of requests that never answer in time")
+    parser.add_argument('--hang-seconds', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    Handler.config = Config(args.latency, args.jitter, args.token_delay, args.failure_rate,
+                            args.hang_rate, args.hang_seconds, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"Fake Ollama listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Served {Handler.config.counters}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import os
+import time
+import functools
+import bisect
+import logging
+import threading
+
+# Timing spans around the hot paths (PDF parsing, skill extraction, matching,
+# LLM calls, prediction, graph rendering, SQLite statements), aggregated into
+# histograms and rendered in the Prometheus text format at /admin/metrics.
+# METRICS=0 turns span() into a shared no-op. With SLOW_REQUEST_MS set, the
+# spans of every request slower than that are logged with the request.
+
+ENABLED = os.environ.get('METRICS', '1') == '1'
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 0)) if ENABLED else 0
+
+# Upper bounds in seconds, as in Prometheus client defaults plus longer LLM calls
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def copy(self):
+        other = Histogram()
+        other.counts, other.sum, other.count = list(self.counts), self.sum, self.count
+        return other
+
+_lock = threading.Lock()
+_spans = {}
+_requests = {}
+_request_counts = {}
+# Start time of the request running on this thread and, when the slow log
+# is on, its spans
+_current = threading.local()
+
+def observe(name, seconds):
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _spans.get(name)
+        if histogram is None:
+            histogram = _spans[name] = Histogram()
+        histogram.observe(seconds)
+    trace = getattr(_current, 'trace', None)
+    if trace is not None:
+        trace.append((name, seconds))
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name):
+    return _Span(name) if ENABLED else _NO_SPAN
+
+def timed(name):
+    # Decorator form of span(); with metrics off the function is left as is
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def observe_query(sql, seconds):
+    # Installed as database.db.query_observer; one series per statement type
+    observe(f"db.{sql.lstrip().split(None, 1)[0].lower()}" if sql.strip() else "db.other", seconds)
+
+def start_request():
+    if ENABLED:
+        _current.started = time.perf_counter()
+        _current.trace = [] if SLOW_REQUEST_MS else None
+
+def finish_request(method, route, status):
+    started = getattr(_current, 'started', None)
+    if started is None:
+        return
+    _current.started = None
+    seconds = time.perf_counter() - started
+    key = (method, route)
+    with _lock:
+        histogram = _requests.get(key)
+        if histogram is None:
+            histogram = _requests[key] = Histogram()
+        histogram.observe(seconds)
+        count_key = (method, route, str(status))
+        _request_counts[count_key] = _request_counts.get(count_key, 0) + 1
+    trace, _current.trace = getattr(_current, 'trace', None), None
+    if trace is not None and seconds * 1000 >= SLOW_REQUEST_MS:
+        totals = {}
+        for name, spent in trace:
+            calls, total = totals.get(name, (0, 0.0))
+            totals[name] = (calls + 1, total + spent)
+        breakdown = ", ".join(f"{name} {total * 1000:.1f}ms" + (f" x{calls}" if calls > 1 else "")
+                              for name, (calls, total) in sorted(totals.items(), key=lambda item: -item[1][1]))
+        logger.warning("Slow request %s %s -> %s in %.0fms: %s", method, route, status, seconds * 1000,
+                       breakdown or "no spans")
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+def _histogram_lines(metric, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+        cumulative += count
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        lines.append(f"{metric}_bucket{{{labels},le=\"{le}\"}} {cumulative}")
+    lines.append(f"{metric}_sum{{{labels}}} {histogram.sum:.6f}")
+    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+    return lines
+
+def render():
+    with _lock:
+        spans = {name: h.copy() for name, h in _spans.items()}
+        requests = {key: h.copy() for key, h in _requests.items()}
+        counts = dict(_request_counts)
+    lines = ["# HELP app_span_seconds Time spent in instrumented stages.",
+             "# TYPE app_span_seconds histogram"]
+    for name in sorted(spans):
+        lines += _histogram_lines('app_span_seconds', _labels(span=name), spans[name])
+    lines += ["# HELP app_request_seconds Request handling time by route.",
+              "# TYPE app_request_seconds histogram"]
+    for method, route in sorted(requests):
+        lines += _histogram_lines('app_request_seconds', _labels(method=method, route=route),
+                                  requests[(method, route)])
+    lines += ["# HELP app_requests_total Requests by route and status.",
+              "# TYPE app_requests_total counter"]
+    for (method, route, status), count in sorted(counts.items()):
+        lines.append(f"app_requests_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+    return "\n".join(lines) + "\n"
+
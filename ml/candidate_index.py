@@ -0,0 +1,282 @@
+import os
+import sys
+import threading
+import numpy as np
+from database.db import connect, db_token
+from metrics import timed
+from startup import stage
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Every candidate's resume text as a hashed term vector, one CSR row per
+# candidate in id order. The CSR arrays (plus each row's id, quiz and resume
+# score) live on disk as raw append-only files and are memory-mapped, so the
+# index loads instantly and workers share its pages. Hashing needs no fitted
+# vocabulary: a new candidate is one row appended to the files and nothing is
+# ever refitted or rewritten. A token file names the database the rows came
+# from; the index starts over when it no longer matches.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+N_FEATURES = 1 << 18
+
+# Final score: 50% resume/job text similarity (0-100), 30% quiz, 20% resume score
+WEIGHTS = (0.5, 0.3, 0.2)
+
+MAX_K = 200
+
+# 'ids' is written last, so its length says how many rows are complete
+FILES = [('data', np.float32), ('indices', np.int32), ('indptr', np.int64),
+         ('quiz', np.float32), ('resume', np.float32), ('ids', np.int64)]
+
+_vectorizer = None
+
+def get_vectorizer():
+    global _vectorizer
+    if _vectorizer is None:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        _vectorizer = HashingVectorizer(n_features=N_FEATURES, stop_words='english', alternate_sign=False,
+                                        norm='l2', dtype=np.float32)
+    return _vectorizer
+
+def index_dir(db_path):
+    # database/candidates.db -> database/candidates_index/
+    return os.path.splitext(os.path.abspath(db_path))[0] + '_index'
+
+def job_text(job):
+    # job: a row from "SELECT * FROM jobs"
+    return f"{job[1] or ''} {job[2] or ''} {job[3] or ''}"
+
+class CandidateIndex:
+    def __init__(self, path):
+        self.path = path
+        self.arrays = {name: np.zeros(0, dtype) for name, dtype in FILES}
+        self.arrays['indptr'] = np.zeros(1, np.int64)
+        self.count = 0
+        self.token = None
+        self.sizes = None
+        self.lock = threading.Lock()
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def refresh(self):
+        # Remaps the files when they grew, e.g. after another worker appended,
+        # or were replaced after a reset
+        try:
+            with open(os.path.join(self.path, 'token')) as f:
+                token = f.read().strip()
+        except OSError:
+            token = None
+        try:
+            sizes = (token,) + tuple(os.path.getsize(self._file(name)) for name, _ in FILES)
+        except OSError:
+            return
+        if sizes == self.sizes:
+            return
+        arrays = {}
+        for (name, dtype), size in zip(FILES, sizes[1:]):
+            length = size // np.dtype(dtype).itemsize
+            arrays[name] = np.memmap(self._file(name), dtype=dtype, mode='r', shape=(length,)) if length else np.zeros(0, dtype)
+        if not len(arrays['indptr']):
+            arrays['indptr'] = np.zeros(1, np.int64)
+        count = min(len(arrays['ids']), len(arrays['quiz']), len(arrays['resume']), len(arrays['indptr']) - 1)
+        # A row is only complete once its terms are on disk too
+        while count and arrays['indptr'][count] > min(len(arrays['data']), len(arrays['indices'])):
+            count -= 1
+        self.arrays, self.count, self.token, self.sizes = arrays, count, token, sizes
+
+    @property
+    def last_id(self):
+        return int(self.arrays['ids'][self.count - 1]) if self.count else 0
+
+    def _truncate(self):
+        # Drops whatever a writer that died midway left after the last complete row
+        nnz = int(self.arrays['indptr'][self.count])
+        lengths = {'data': nnz, 'indices': nnz, 'indptr': self.count + 1,
+                   'quiz': self.count, 'resume': self.count, 'ids': self.count}
+        for name, dtype in FILES:
+            with open(self._file(name), 'ab') as f:
+                f.truncate(lengths[name] * np.dtype(dtype).itemsize)
+        if self.count == 0:
+            with open(self._file('indptr'), 'wb') as f:
+                f.write(np.zeros(1, np.int64).tobytes())
+
+    def reset(self, token, max_id):
+        # Empties the index for the database named by token. The files are
+        # replaced rather than truncated, so readers still mapping the old
+        # ones are unaffected; the token goes last, so a reset cut short is
+        # redone. Returns False when another process already did it.
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock, open(os.path.join(self.path, 'lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self.sizes = None
+            self.refresh()
+            if self.token == token and self.last_id <= max_id:
+                return False
+            token_path = os.path.join(self.path, 'token')
+            for path in [token_path] + [self._file(name) for name, _ in FILES]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            for name, _ in FILES:
+                with open(self._file(name), 'wb') as f:
+                    if name == 'indptr':
+                        f.write(np.zeros(1, np.int64).tobytes())
+            with open(token_path + '.tmp', 'w') as f:
+                f.write(token or '')
+            os.replace(token_path + '.tmp', token_path)
+            self.sizes = None
+            self.refresh()
+            return True
+
+    def append(self, rows):
+        # rows: (id, resume_text, quiz, resume_score) in id order. Rows at or
+        # below the last indexed id were added by someone else meanwhile and are skipped.
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock, open(os.path.join(self.path, 'lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self.sizes = None
+            self.refresh()
+            rows = [r for r in rows if r[0] > self.last_id]
+            if not rows:
+                return 0
+            self._truncate()
+            matrix = get_vectorizer().transform([r[1] or '' for r in rows]).tocsr()
+            matrix.sort_indices()
+            base = int(self.arrays['indptr'][self.count])
+            columns = {
+                'data': matrix.data.astype(np.float32),
+                'indices': matrix.indices.astype(np.int32),
+                'quiz': np.array([r[2] or 0 for r in rows], dtype=np.float32),
+                'resume': np.array([r[3] or 0 for r in rows], dtype=np.float32),
+                'indptr': (matrix.indptr[1:] + base).astype(np.int64),
+                'ids': np.array([r[0] for r in rows], dtype=np.int64),
+            }
+            for name in ('data', 'indices', 'quiz', 'resume', 'indptr', 'ids'):
+                with open(self._file(name), 'ab') as f:
+                    f.write(columns[name].tobytes())
+            self.sizes = None
+            self.refresh()
+            return len(rows)
+
+    def matrix(self):
+        n = self.count
+        indptr = self.arrays['indptr'][:n + 1]
+        nnz = int(indptr[-1])
+        # int32 row pointers match the int32 column indices, so scipy uses the
+        # mapped arrays as they are instead of converting them
+        if nnz < 2 ** 31:
+            indptr = indptr.astype(np.int32)
+        import scipy.sparse as sp
+        return sp.csr_matrix((self.arrays['data'][:nnz], self.arrays['indices'][:nnz], indptr),
+                             shape=(n, N_FEATURES), copy=False)
+
+    def search(self, text, k=20):
+        # Returns [(candidate id, final score, text similarity 0-100)], best first
+        self.refresh()
+        n = self.count
+        if n == 0:
+            return []
+        query = get_vectorizer().transform([text])
+        dense = np.zeros(N_FEATURES, dtype=np.float32)
+        dense[query.indices] = query.data
+        similarity = self.matrix() @ dense * 100
+        scores = WEIGHTS[0] * similarity + WEIGHTS[1] * self.arrays['quiz'][:n] + WEIGHTS[2] * self.arrays['resume'][:n]
+        k = min(max(int(k), 1), n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        ids = self.arrays['ids']
+        return [(int(ids[i]), round(float(scores[i]), 2), round(float(similarity[i]), 2)) for i in top]
+
+_indexes = {}
+_lock = threading.Lock()
+
+def get_candidate_index(db_path):
+    path = index_dir(db_path)
+    with _lock:
+        index = _indexes.get(path)
+        if index is None:
+            with stage('candidate index'):
+                index = _indexes[path] = CandidateIndex(path)
+                index.refresh()
+        return index
+
+def _check_source(index, conn):
+    # Starts the index over when the database was recreated (another token)
+    # or no longer reaches its last indexed id; otherwise old rows would be
+    # reported under ids that now belong to other candidates. Returns the
+    # highest candidate id.
+    max_id = conn.execute("SELECT MAX(id) FROM candidates").fetchone()[0] or 0
+    token = db_token(conn)
+    index.refresh()
+    if index.token != token or max_id < index.last_id:
+        index.reset(token, max_id)
+    return max_id
+
+def update_candidate_index(db_path, chunk_size=2000):
+    # Appends every candidate added since the last indexed one. Candidates
+    # without stored resume text get an empty row and only score on quiz and
+    # resume score. Returns the number of rows appended.
+    index = get_candidate_index(db_path)
+    conn = connect(db_path)
+    appended = 0
+    try:
+        _check_source(index, conn)
+        last_id = index.last_id
+        while True:
+            rows = conn.execute("SELECT id, resume_text, quiz, resume_score FROM candidates WHERE id > ? ORDER BY id LIMIT ?",
+                                (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            appended += index.append(rows)
+            last_id = rows[-1][0]
+    finally:
+        conn.close()
+    return appended
+
+@timed('candidates.top')
+def top_candidates(db_path, job, k=20):
+    # job: a row from "SELECT * FROM jobs". Catches the index up first, which
+    # costs an indexed MAX(id) and a token lookup when nothing is missing.
+    index = get_candidate_index(db_path)
+    conn = connect(db_path)
+    try:
+        max_id = _check_source(index, conn)
+        if max_id > index.last_id:
+            update_candidate_index(db_path)
+        results = index.search(job_text(job), min(k, MAX_K))
+        ids = [candidate_id for candidate_id, _, _ in results]
+        rows = {row[0]: row for row in conn.execute(
+            f"SELECT id, name, quiz, resume_score, selected, skills_list FROM candidates WHERE id IN ({','.join('?' * len(ids))})", ids)}
+    finally:
+        conn.close()
+    return [{'id': candidate_id, 'name': rows[candidate_id][1], 'quiz': rows[candidate_id][2],
+             'resume_score': rows[candidate_id][3], 'selected': rows[candidate_id][4],
+             'skills_list': rows[candidate_id][5], 'text_match': similarity, 'final_score': score}
+            for candidate_id, score, similarity in results if candidate_id in rows]
+
+def main(argv=None):
+    import time
+    import argparse
+    parser = argparse.ArgumentParser(description="Bring the candidate vector index up to date with the candidates table")
+    parser.add_argument('--db', default=os.path.join(BASE_DIR, 'database', 'candidates.db'))
+    args = parser.parse_args(argv)
+
+    from database.db import migrate
+    migrate(args.db)
+    start = time.perf_counter()
+    appended = update_candidate_index(args.db)
+    index = get_candidate_index(args.db)
+    print(f"Appended {appended} candidates in {time.perf_counter() - start:.1f}s; "
+          f"{index.count} indexed, {int(index.arrays['indptr'][index.count])} terms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
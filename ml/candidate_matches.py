@@ -0,0 +1,145 @@
+import os
+import sys
+from database.db import connect
+from ml.job_index import get_job_index
+from metrics import timed
+
+# Precomputed resume/job similarity in candidate_job_match, one row for each
+# job a candidate meets the thresholds of, plus candidates.resume_match as
+# the best score over all jobs. A new candidate is scored against every job
+# once; a new job is scored against every stored candidate in one batched
+# pass in the background, so neither side recomputes TF-IDF per page view.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def candidate_text(resume_text, summary, skills_list):
+    # Candidates stored before resume text was kept fall back to their profile
+    return resume_text or f"{summary or ''} {skills_list or ''}"
+
+def eligible(quiz, resume_score, min_quiz, min_resume):
+    # The same test as job_matching.eligible_job_ids
+    return (min_quiz or 0) <= (quiz or 0) and (min_resume or 0) <= (resume_score or 0)
+
+def stored_matches(conn, candidate_id):
+    return dict(conn.execute("SELECT job_id, score FROM candidate_job_match WHERE candidate_id = ?", (candidate_id,)))
+
+def store_pairs(conn, candidate_id, scores):
+    # scores: {job_id: score}
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO candidate_job_match (candidate_id, job_id, score) VALUES (?, ?, ?)",
+                         [(candidate_id, job_id, score) for job_id, score in scores.items()])
+
+@timed('matches.candidate')
+def score_candidate(db_path, candidate_id):
+    # Scores one candidate against all jobs: writes their eligible pairs and
+    # resume_match, and touches no other candidate. Call it after the
+    # candidate's row is committed so a job added meanwhile is never missed.
+    # Returns the number of pairs stored.
+    conn = connect(db_path)
+    try:
+        row = conn.execute("SELECT resume_text, summary, skills_list, quiz, resume_score FROM candidates WHERE id = ?",
+                           (candidate_id,)).fetchone()
+        if row is None:
+            return 0
+        scores = get_job_index(db_path).score(candidate_text(row[0], row[1], row[2]))
+        jobs = conn.execute("SELECT id, min_quiz_score, min_resume_score FROM jobs").fetchall()
+        pairs = {job_id: scores.get(job_id, 0.0) for job_id, min_quiz, min_resume in jobs
+                 if eligible(row[3], row[4], min_quiz, min_resume)}
+        store_pairs(conn, candidate_id, pairs)
+        with conn:
+            conn.execute("UPDATE candidates SET resume_match = ? WHERE id = ?", (max(scores.values(), default=0.0), candidate_id))
+        return len(pairs)
+    finally:
+        conn.close()
+
+@timed('matches.job')
+def score_new_job(db_path, job_id, chunk_size=2000):
+    # Scores one job against every stored candidate in id-ordered chunks.
+    # Stores the pairs of the candidates that meet its thresholds and raises
+    # resume_match where the new job is their best one. Returns
+    # (candidates scored, pairs stored, resume_match raised).
+    conn = connect(db_path)
+    scored = stored = raised = 0
+    last_id = 0
+    try:
+        job = conn.execute("SELECT min_quiz_score, min_resume_score FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return scored, stored, raised
+        index = get_job_index(db_path)
+        while True:
+            rows = conn.execute("SELECT id, resume_text, summary, skills_list, quiz, resume_score, resume_match FROM candidates WHERE id > ? ORDER BY id LIMIT ?",
+                                (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scores = index.score_job([candidate_text(r[1], r[2], r[3]) for r in rows], job_id)
+            pairs = [(r[0], job_id, float(s)) for r, s in zip(rows, scores) if eligible(r[4], r[5], job[0], job[1])]
+            better = [(float(s), r[0], float(s)) for r, s in zip(rows, scores) if s > (r[6] or 0)]
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO candidate_job_match (candidate_id, job_id, score) VALUES (?, ?, ?)", pairs)
+                # Re-checked in SQL in case the candidate was re-scored meanwhile
+                conn.executemany("UPDATE candidates SET resume_match = ? WHERE id = ? AND COALESCE(resume_match, 0) < ?", better)
+            scored += len(rows)
+            stored += len(pairs)
+            raised += len(better)
+    finally:
+        conn.close()
+    return scored, stored, raised
+
+@timed('matches.rebuild')
+def rebuild(db_path, chunk_size=2000):
+    # Every candidate against every job under the current fit, in id-ordered
+    # chunks. Queued when adding a job refitted the job index, since stored
+    # scores only hold for the IDF they were computed with. Each chunk
+    # replaces its candidates' pairs and resume_match in one transaction, so
+    # readers never see a candidate half done. Returns (candidates, pairs).
+    conn = connect(db_path)
+    scored = stored = 0
+    last_id = 0
+    try:
+        index = get_job_index(db_path)
+        thresholds = {row[0]: row[1:] for row in conn.execute("SELECT id, min_quiz_score, min_resume_score FROM jobs")}
+        columns = [(i, job_id) for i, job_id in enumerate(index.job_ids) if job_id in thresholds]
+        while True:
+            rows = conn.execute("SELECT id, resume_text, summary, skills_list, quiz, resume_score FROM candidates WHERE id > ? ORDER BY id LIMIT ?",
+                                (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scores = index.score_many([candidate_text(r[1], r[2], r[3]) for r in rows])
+            pairs = [(r[0], job_id, float(scores[k, i])) for k, r in enumerate(rows) for i, job_id in columns
+                     if eligible(r[4], r[5], *thresholds[job_id])]
+            best = [(float(scores[k].max()) if scores.shape[1] else 0.0, r[0]) for k, r in enumerate(rows)]
+            with conn:
+                conn.execute("DELETE FROM candidate_job_match WHERE candidate_id BETWEEN ? AND ?", (rows[0][0], last_id))
+                conn.executemany("INSERT OR REPLACE INTO candidate_job_match (candidate_id, job_id, score) VALUES (?, ?, ?)", pairs)
+                conn.executemany("UPDATE candidates SET resume_match = ? WHERE id = ?", best)
+            scored += len(rows)
+            stored += len(pairs)
+    finally:
+        conn.close()
+    return scored, stored
+
+def main(argv=None):
+    import time
+    import argparse
+    parser = argparse.ArgumentParser(description="Score candidates against jobs into candidate_job_match")
+    parser.add_argument('--db', default=os.path.join(BASE_DIR, 'database', 'candidates.db'))
+    parser.add_argument('--job', type=int, default=None, help="score only this job (default: rebuild everything)")
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    from database.db import migrate
+    migrate(args.db)
+    start = time.perf_counter()
+    if args.job is not None:
+        scored, stored, raised = score_new_job(args.db, args.job, args.chunk_size)
+        print(f"Job {args.job}: {scored} candidates scored, {stored} eligible pairs stored, "
+              f"{raised} resume matches raised in {time.perf_counter() - start:.1f}s")
+    else:
+        scored, stored = rebuild(args.db, args.chunk_size)
+        print(f"{scored} candidates scored against every job, {stored} eligible pairs stored in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
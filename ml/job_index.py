@@ -0,0 +1,216 @@
+import os
+import math
+import threading
+import numpy as np
+from database.db import connect
+from startup import stage
+from metrics import timed
+
+# scikit-learn, SciPy and joblib are imported where they are used, so
+# importing this module does not load them.
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'job_index.pkl')
+
+# Jobs added after the last full fit are transformed with the existing vocabulary.
+# Once they exceed this share of the fitted corpus the vectorizer is refitted.
+REFIT_RATIO = 0.2
+
+def job_document(description, skills_required):
+    return f"{description or ''} {skills_required or ''}"
+
+class JobIndex:
+    def __init__(self):
+        self.vectorizer = None
+        self.matrix = None
+        self.job_ids = []
+        self.fitted_count = 0
+        self.positions = None
+
+    def fit(self, jobs):
+        # jobs: iterable of (id, description, skills_required)
+        jobs = list(jobs)
+        self.job_ids = [job[0] for job in jobs]
+        self.fitted_count = len(jobs)
+        self.positions = None
+        self.vectorizer = None
+        self.matrix = None
+        if not jobs:
+            return self
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.preprocessing import normalize
+        vectorizer = TfidfVectorizer(stop_words='english', norm=None)
+        try:
+            raw = vectorizer.fit_transform([job_document(job[1], job[2]) for job in jobs])
+        except ValueError:
+            # Every job description is empty or made of stop words
+            return self
+        self.vectorizer = vectorizer
+        self.matrix = normalize(raw).tocsr()
+        return self
+
+    def needs_refit(self):
+        added = len(self.job_ids) - self.fitted_count
+        return self.vectorizer is None or added > REFIT_RATIO * self.fitted_count
+
+    def add_job(self, job_id, description, skills_required):
+        # Returns False when the caller should refit the whole index instead
+        if self.vectorizer is None:
+            return False
+        import scipy.sparse as sp
+        from sklearn.preprocessing import normalize
+        row = normalize(self.vectorizer.transform([job_document(description, skills_required)]))
+        self.matrix = sp.vstack([self.matrix, row], format='csr')
+        self.job_ids.append(job_id)
+        return not self.needs_refit()
+
+    def _resume_vectors(self, texts):
+        # Same vectors as vectorizer.transform(texts), but each text is
+        # tokenized once for both the vector and its norm. Words the job corpus
+        # has never seen still count towards the resume's length, weighted with
+        # the idf of an unseen term, like a pairwise fit would.
+        import scipy.sparse as sp
+        analyzer = self.vectorizer.build_analyzer()
+        vocab = self.vectorizer.vocabulary_
+        unseen_idf = math.log(1 + len(self.job_ids)) + 1
+        norms = np.empty(len(texts))
+        indptr = [0]
+        indices = []
+        values = []
+        for i, text in enumerate(texts):
+            counts = {}
+            unseen = {}
+            for token in analyzer(text):
+                column = vocab.get(token)
+                if column is None:
+                    unseen[token] = unseen.get(token, 0) + 1
+                else:
+                    counts[column] = counts.get(column, 0) + 1
+            indices.extend(counts)
+            values.extend(counts.values())
+            indptr.append(len(indices))
+            norms[i] = sum((c * unseen_idf) ** 2 for c in unseen.values())
+        indices = np.array(indices, dtype=np.int32)
+        vectors = sp.csr_matrix((np.array(values, dtype=np.float64) * self.vectorizer.idf_[indices], indices, indptr),
+                                shape=(len(texts), len(vocab)))
+        vectors.sort_indices()
+        norms = np.sqrt(norms + np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return vectors, norms
+
+    def score_many(self, texts):
+        # (len(texts), n_jobs) matrix of cosine scores on the 0-100 scale
+        if self.vectorizer is None or not texts:
+            return np.zeros((len(texts), len(self.job_ids)))
+        vectors, norms = self._resume_vectors(texts)
+        scores = (vectors @ self.matrix.T).toarray() / norms[:, None]
+        return np.round(scores * 100, 2)
+
+    def score_job(self, texts, job_id):
+        # Scores of many resumes against one job, without the other jobs' columns
+        if self.vectorizer is None or job_id not in self.job_ids or not texts:
+            return np.zeros(len(texts))
+        vectors, norms = self._resume_vectors(texts)
+        row = self.matrix[self.job_ids.index(job_id)]
+        scores = (vectors @ row.T).toarray().ravel() / norms
+        return np.round(scores * 100, 2)
+
+    def score_jobs(self, text, job_ids):
+        # {job_id: score} for just these jobs
+        if self.vectorizer is None or not text or not text.strip():
+            return {job_id: 0.0 for job_id in job_ids}
+        if getattr(self, 'positions', None) is None or len(self.positions) != len(self.job_ids):
+            self.positions = {job_id: i for i, job_id in enumerate(self.job_ids)}
+        rows = [self.positions.get(job_id) for job_id in job_ids]
+        present = sorted({row for row in rows if row is not None})
+        if not present:
+            return {job_id: 0.0 for job_id in job_ids}
+        # Only the requested jobs' rows are multiplied
+        vectors, norms = self._resume_vectors([text])
+        scores = (vectors @ self.matrix[present].T).toarray()[0] / norms[0]
+        scores = dict(zip(present, np.round(scores * 100, 2)))
+        return {job_id: float(scores[row]) if row is not None else 0.0 for job_id, row in zip(job_ids, rows)}
+
+    def score(self, resume_text):
+        if not resume_text or not resume_text.strip():
+            return {job_id: 0.0 for job_id in self.job_ids}
+        scores = self.score_many([resume_text])[0]
+        return {job_id: float(s) for job_id, s in zip(self.job_ids, scores)}
+
+_index = None
+_index_signature = None
+_lock = threading.Lock()
+
+def _jobs_signature(conn):
+    count, max_id = conn.execute("SELECT COUNT(*), MAX(id) FROM jobs").fetchone()
+    return count, max_id
+
+def _signature_of(index):
+    return len(index.job_ids), max(index.job_ids) if index.job_ids else None
+
+def _rebuild(conn, index_path):
+    jobs = conn.execute("SELECT id, description, skills_required FROM jobs ORDER BY id").fetchall()
+    index = JobIndex().fit(jobs)
+    save_job_index(index, index_path)
+    return index
+
+def save_job_index(index, index_path=DEFAULT_INDEX_PATH):
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        import joblib
+        joblib.dump(index, tmp_path)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"Failed to save job index: {e}")
+
+def _load_saved(index_path):
+    try:
+        import joblib
+        return joblib.load(index_path)
+    except Exception:
+        return None
+
+def get_job_index(db_path, index_path=DEFAULT_INDEX_PATH):
+    # The in-process index is checked against the jobs table on every call, so
+    # jobs added by another worker are picked up from disk or by a rebuild.
+    global _index, _index_signature
+    conn = connect(db_path)
+    try:
+        signature = _jobs_signature(conn)
+        if _index is not None and _index_signature == signature:
+            return _index
+        with _lock:
+            if _index is not None and _index_signature == signature:
+                return _index
+            with stage('job index'):
+                index = _load_saved(index_path)
+                if index is None or _signature_of(index) != signature:
+                    index = _rebuild(conn, index_path)
+            _index, _index_signature = index, signature
+            return index
+    finally:
+        conn.close()
+
+def on_job_added(db_path, job_id, description, skills_required, index_path=DEFAULT_INDEX_PATH):
+    # Returns False when the index was refitted: the IDF changed, so scores
+    # computed against the old fit are out of date
+    global _index, _index_signature
+    conn = connect(db_path)
+    try:
+        with _lock:
+            signature = _jobs_signature(conn)
+            index = _index if _index is not None else _load_saved(index_path)
+            # Only extend the index in place if it is exactly one job behind the table
+            in_step = index is not None and len(index.job_ids) == signature[0] - 1 and signature[1] == job_id
+            extended = in_step and index.add_job(job_id, description, skills_required)
+            if extended:
+                save_job_index(index, index_path)
+            else:
+                index = _rebuild(conn, index_path)
+            _index, _index_signature = index, signature
+            return extended
+    finally:
+        conn.close()
+
+@timed('jobs.score')
+def score_resume_against_jobs(db_path, resume_text):
+    return get_job_index(db_path).score(resume_text)
@@ -0,0 +1,71 @@
+import heapq
+import threading
+from collections import OrderedDict
+from database.db import connect
+from ml.skill_catalog import get_skill_catalog
+from ml.job_index import get_job_index
+from ml.candidate_matches import candidate_text, stored_matches, store_pairs
+from metrics import timed
+
+# Jobs a candidate is eligible for, ranked by how many of each job's skills
+# they have and then by TF-IDF similarity to their resume. Eligibility is an
+# indexed range query on the job thresholds; skill overlap is a bitmap AND;
+# similarity is read from candidate_job_match.
+
+CACHE_SIZE = 1024
+
+# candidate row id -> (catalog the result was computed against, result).
+# Candidate rows do not change once written, and a new job replaces the
+# catalog, so an entry is valid while its catalog is the current one.
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def eligible_job_ids(conn, quiz_score, resume_score):
+    return [row[0] for row in conn.execute(
+        "SELECT id FROM jobs WHERE min_quiz_score <= ? AND min_resume_score <= ?", (quiz_score, resume_score))]
+
+@timed('jobs.match')
+def match_jobs(db_path, candidate, limit=20):
+    # candidate: a row from "SELECT * FROM candidates". Returns (total, jobs)
+    # where jobs are the top `limit` job rows, each extended with its list of
+    # missing skills.
+    catalog = get_skill_catalog(db_path)
+    with _lock:
+        hit = _cache.get(candidate[0])
+        if hit is not None and hit[0] is catalog:
+            _cache.move_to_end(candidate[0])
+            return hit[1]
+
+    conn = connect(db_path)
+    try:
+        job_ids = eligible_job_ids(conn, candidate[5], candidate[7] or 0)
+        have = catalog.bitmap(candidate[9])
+        coverage = {job_id: catalog.coverage(job_id, have) for job_id in job_ids}
+        # TF-IDF only orders jobs with equal coverage, so it is only computed
+        # for the ones that can still make the cut
+        cutoff = heapq.nlargest(limit, coverage.values())[-1] if len(job_ids) > limit else 0.0
+        contenders = [job_id for job_id in job_ids if coverage[job_id] >= cutoff]
+        similarity = stored_matches(conn, candidate[0])
+        # Pairs not scored yet (a job whose background pass is still running,
+        # or a candidate from before the table) are scored now and stored
+        missing = [job_id for job_id in contenders if job_id not in similarity]
+        if missing:
+            scores = get_job_index(db_path).score_jobs(candidate_text(candidate[13], candidate[8], candidate[9]), missing)
+            store_pairs(conn, candidate[0], scores)
+            similarity.update(scores)
+        top = sorted(contenders, key=lambda j: (-coverage[j], -similarity[j], j))[:limit]
+        rows = {}
+        if top:
+            placeholders = ','.join(['?'] * len(top))
+            rows = {row[0]: row for row in conn.execute(f"SELECT * FROM jobs WHERE id IN ({placeholders})", top)}
+    finally:
+        conn.close()
+
+    jobs = [rows[job_id] + (catalog.job_gap(job_id, candidate[9]),) for job_id in top if job_id in rows]
+    result = (len(job_ids), jobs)
+    with _lock:
+        _cache[candidate[0]] = (catalog, result)
+        _cache.move_to_end(candidate[0])
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,288 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+import numpy as np
+from database.db import connect
+from startup import stage
+from metrics import timed
+
+# The selection RandomForest flattened into a handful of NumPy arrays: every
+# tree's nodes are concatenated, child pointers are global offsets, leaves
+# point back at themselves and leaf values are class probabilities.
+# Prediction walks all trees for a block of rows at once, one vectorized step
+# per level. The arrays hold no Python objects, so after a fork the pages stay
+# shared between workers.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Generated, not committed: `python -m ml.predictor export` flattens model.pkl
+# into it and ml/train_model.py promotes new ones. Without it the pickle is used.
+FOREST_PATH = os.path.join(BASE_DIR, 'model.forest.npz')
+PICKLE_PATH = os.path.join(BASE_DIR, 'model.pkl')
+
+FEATURES = ['experience', 'skills', 'quiz']
+
+# How often predict() looks at the model file for a newer version
+RELOAD_CHECK_SECONDS = 5
+
+# Rows evaluated together; keeps the (rows x trees) working set in cache
+BLOCK_ROWS = 1024
+
+# Largest decision table export_forest will precompute (one byte per cell)
+MAX_TABLE_CELLS = 5_000_000
+
+class Forest:
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.classes = arrays['classes']
+        self.max_depth = int(arrays['max_depth'])
+        self.version = str(arrays['version'])
+        # Optional decision table: every threshold the forest tests splits its
+        # feature into bins, and the predicted class is constant within each
+        # combination of bins, so it can be looked up instead of walked
+        self.table = arrays.get('table')
+        self.edges = np.split(arrays['edges'], np.cumsum(arrays['edge_counts'])[:-1]) if self.table is not None else None
+
+    def predict_proba(self, X):
+        # Same comparison as scikit-learn: float32 features against the
+        # float64 thresholds the trees were fitted with
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        proba = np.empty((len(X), self.value.shape[1]))
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            # Row offsets into the flattened block, to gather one feature per (row, tree)
+            offsets = (np.arange(len(block)) * block.shape[1])[:, None]
+            flat = block.ravel()
+            node = np.broadcast_to(self.roots, (len(block), len(self.roots)))
+            for _ in range(self.max_depth):
+                go_left = flat[offsets + self.feature[node]] <= self.threshold[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+            proba[start:start + len(block)] = self.value[node].mean(axis=1)
+        return proba
+
+    def bins(self, X):
+        # Number of the feature's thresholds strictly below each value, i.e.
+        # how many "x <= threshold" tests the value fails
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32)).astype(np.float64)
+        return tuple(np.searchsorted(edges, X[:, f], side='left') for f, edges in enumerate(self.edges))
+
+    def predict(self, X):
+        if self.table is not None:
+            return self.classes[self.table[self.bins(X)]]
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+def export_forest(model, version=None):
+    # Flattens a fitted RandomForestClassifier into the arrays Forest reads
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left < 0
+        own = np.arange(tree.node_count) + offset
+        roots.append(offset)
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        # A row that reaches a leaf stays there for the remaining levels
+        lefts.append(np.where(leaf, own, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(leaf, own, tree.children_right + offset).astype(np.int32))
+        value = tree.value[:, 0, :].astype(np.float64)
+        values.append(value / value.sum(axis=1, keepdims=True))
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+        'classes': np.asarray(model.classes_),
+        'max_depth': np.array(max_depth),
+    }
+    arrays.update(decision_table(arrays))
+    if version is None:
+        digest = hashlib.sha256()
+        for name in ('feature', 'threshold', 'left', 'right', 'value'):
+            digest.update(arrays[name].tobytes())
+        version = digest.hexdigest()[:12]
+    arrays['version'] = np.array(version)
+    return arrays
+
+def decision_table(arrays):
+    # Replaces each threshold by its rank among the feature's thresholds and
+    # walks the forest once per combination of bins: x <= t_j exactly when
+    # fewer than j + 1 thresholds lie below x.
+    internal = arrays['left'] != np.arange(len(arrays['left']))
+    n_features = int(arrays['feature'][internal].max()) + 1 if internal.any() else 1
+    edges = [np.unique(arrays['threshold'][internal & (arrays['feature'] == f)]) for f in range(n_features)]
+    shape = tuple(len(e) + 1 for e in edges)
+    if np.prod(shape, dtype=np.int64) > MAX_TABLE_CELLS:
+        return {}
+    ranked = dict(arrays, threshold=arrays['threshold'].copy(), version=np.array(''))
+    for f, e in enumerate(edges):
+        nodes = internal & (arrays['feature'] == f)
+        ranked['threshold'][nodes] = np.searchsorted(e, arrays['threshold'][nodes])
+    grid = np.indices(shape).reshape(len(shape), -1).T
+    table = np.argmax(Forest(ranked).predict_proba(grid), axis=1).astype(np.int8).reshape(shape)
+    return {'table': table, 'edges': np.concatenate(edges), 'edge_counts': np.array([len(e) for e in edges])}
+
+def save_forest(arrays, path=FOREST_PATH):
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+def save_pickle(model, path=PICKLE_PATH):
+    # Written aside and renamed, so a reload never reads half a file
+    import joblib
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+def default_model_path():
+    return FOREST_PATH if os.path.exists(FOREST_PATH) else PICKLE_PATH
+
+def load_forest(path):
+    if path.endswith('.pkl'):
+        import joblib
+        return Forest(export_forest(joblib.load(path)))
+    if path.endswith('.joblib'):
+        # Versioned artifacts from train_model.py are stored uncompressed
+        import joblib
+        return Forest(export_forest(joblib.load(path, mmap_mode='r')))
+    with np.load(path, allow_pickle=False) as data:
+        return Forest({name: data[name] for name in data.files})
+
+class Predictor:
+    # Holds the current Forest and swaps in a new one when the file changes.
+    # Without an explicit path the forest file is preferred whenever it
+    # exists, so one promoted after startup replaces the pickle.
+    # Nothing is read until the first prediction or an explicit load().
+    def __init__(self, path=None):
+        self.fixed_path = path
+        self.path = path or default_model_path()
+        self.forest = None
+        self.mtime = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        if self.forest is None:
+            with stage('selection model'):
+                self.reload()
+            self.checked_at = time.monotonic()
+        return self.forest is not None
+
+    @property
+    def version(self):
+        return self.forest.version if self.forest is not None else None
+
+    def reload(self, path=None):
+        path = path or self.path
+        try:
+            mtime = os.path.getmtime(path)
+            forest = load_forest(path)
+        except Exception as e:
+            print(f"Failed to load model: {e}")
+            return False
+        with self.lock:
+            self.forest, self.mtime, self.path = forest, mtime, path
+        return True
+
+    def _maybe_reload(self):
+        if self.forest is None:
+            self.load()
+            return
+        now = time.monotonic()
+        if now - self.checked_at < RELOAD_CHECK_SECONDS:
+            return
+        self.checked_at = now
+        path = self.fixed_path or default_model_path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        if path != self.path or mtime != self.mtime:
+            self.reload(path)
+
+    @timed('model.predict')
+    def predict(self, X):
+        # Returns (predictions, version of the model that made them)
+        self._maybe_reload()
+        forest = self.forest
+        if forest is None:
+            raise RuntimeError("No model loaded")
+        return forest.predict(X), forest.version
+
+    def predict_one(self, experience, skills, quiz):
+        predictions, version = self.predict([[experience, skills, quiz]])
+        return int(predictions[0]), version
+
+# Candidates whose status is still the model's own prediction; an admin
+# decision sets reviewed_at and takes the row out of re-scoring for good
+PENDING = "reviewed_at IS NULL AND selected IN (0, 1)"
+
+def rescore_pending(db_path, predictor, chunk_size=5000):
+    # Re-predicts every candidate not reviewed by an admin in id-ordered
+    # chunks, so a new model can both promote and demote. The UPDATEs re-check
+    # the condition so a decision an admin makes meanwhile is never
+    # overwritten. Returns (rows scored, rows changed).
+    conn = connect(db_path)
+    scored = changed = 0
+    last_id = 0
+    try:
+        while True:
+            rows = conn.execute(f"SELECT id, experience, skills, quiz, selected FROM candidates WHERE {PENDING} AND id > ? ORDER BY id LIMIT ?",
+                                (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            X = np.array([[r[1] or 0, r[2] or 0, r[3] or 0] for r in rows], dtype=np.float64)
+            predictions, version = predictor.predict(X)
+            with conn:
+                conn.executemany(f"UPDATE candidates SET model_version = ? WHERE id = ? AND {PENDING}",
+                                 [(version, r[0]) for r in rows])
+                cur = conn.executemany(f"UPDATE candidates SET selected = ? WHERE id = ? AND {PENDING}",
+                                       [(int(p), r[0]) for p, r in zip(predictions, rows) if int(p) != r[4]])
+            scored += len(rows)
+            changed += max(cur.rowcount, 0)
+    finally:
+        conn.close()
+    return scored, changed
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Export the selection model or re-score pending candidates")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="flatten a pickled RandomForest into a .npz forest")
+    export.add_argument('--model', default=PICKLE_PATH)
+    export.add_argument('--output', default=FOREST_PATH)
+    export.add_argument('--version', default=None, help="tag recorded with each prediction (default: content hash)")
+    rescore = sub.add_parser('rescore', help="re-predict selected for all candidates no admin has reviewed")
+    rescore.add_argument('--db', default=os.path.join(BASE_DIR, 'database', 'candidates.db'))
+    rescore.add_argument('--model', default=None)
+    rescore.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        import joblib
+        arrays = export_forest(joblib.load(args.model), args.version)
+        save_forest(arrays, args.output)
+        print(f"Exported {len(arrays['roots'])} trees, {len(arrays['feature'])} nodes as version {arrays['version']} to {args.output}")
+    else:
+        from database.db import migrate
+        migrate(args.db)
+        predictor = Predictor(args.model)
+        start = time.perf_counter()
+        scored, changed = rescore_pending(args.db, predictor, args.chunk_size)
+        print(f"Re-scored {scored} pending candidates with model {predictor.version} in {time.perf_counter() - start:.1f}s; {changed} changed status")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import threading
+import numpy as np
+from database.db import connect
+
+# Used as the job description for the overall leaderboard
+GENERIC_JOB_DOC = "software engineering machine learning nlp web application"
+
+# Weighted final score: 40% resume match, 30% quiz, 20% skills, 10% experience
+WEIGHTS = np.array([0.40, 0.30, 0.20, 0.10], dtype=np.float32)
+
+class RankingEngine:
+    def __init__(self, candidates, jobs):
+        # candidates: rows of (id, name, skills, quiz, experience, summary)
+        # jobs: rows of (id, title, description, skills_required)
+        self.candidate_ids = np.array([c[0] for c in candidates], dtype=np.int64)
+        self.names = [c[1] or "" for c in candidates]
+        self.job_ids = [j[0] for j in jobs]
+        self.job_titles = {j[0]: j[1] for j in jobs}
+        self._job_column = {job_id: i for i, job_id in enumerate(self.job_ids)}
+
+        skills = np.array([c[2] or 0 for c in candidates], dtype=np.float32)
+        quiz = np.array([c[3] or 0 for c in candidates], dtype=np.float32)
+        experience = np.array([c[4] or 0 for c in candidates], dtype=np.float32)
+        # Normalize skills and experience to roughly 0-100
+        features = np.column_stack([quiz, np.minimum(100, skills * 10), np.minimum(100, experience * 10)])
+        base = features @ WEIGHTS[1:]
+
+        match = self._match_matrix([c[5] or "" for c in candidates],
+                                   [f"{j[2]} {j[3]}" for j in jobs] + [GENERIC_JOB_DOC])
+        # Final score for every candidate x job (last column is the generic job)
+        self.scores = WEIGHTS[0] * match + base[:, None]
+
+        # Leaderboards list each name once with their best application
+        unique_names, self._name_codes = np.unique(np.array(self.names, dtype=object), return_inverse=True)
+        self.unique_names = list(unique_names)
+
+    @staticmethod
+    def _match_matrix(summaries, job_docs):
+        if not summaries:
+            return np.zeros((0, len(job_docs)), dtype=np.float32)
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        vectorizer = TfidfVectorizer(stop_words='english', dtype=np.float32)
+        try:
+            tfidf = vectorizer.fit_transform(summaries + job_docs)
+        except ValueError:
+            return np.zeros((len(summaries), len(job_docs)), dtype=np.float32)
+        # Rows are l2-normalized, so the sparse product is the cosine similarity
+        candidate_vecs = tfidf[:len(summaries)]
+        job_vecs = tfidf[len(summaries):]
+        return (candidate_vecs @ job_vecs.T).toarray() * 100
+
+    def _column(self, job_id):
+        # Unknown jobs fall back to the generic description, like the old graph did
+        return self._job_column.get(job_id, len(self.job_ids))
+
+    def top_k(self, job_id=None, k=20):
+        if not self.names:
+            return []
+        column = self.scores[:, self._column(job_id)]
+        best = np.full(len(self.unique_names), -np.inf, dtype=np.float32)
+        np.maximum.at(best, self._name_codes, column)
+        k = min(k, len(best)) if k else len(best)
+        top = np.argpartition(-best, k - 1)[:k]
+        top = top[np.argsort(-best[top], kind='stable')]
+        return [{'name': self.unique_names[i], 'final_score': round(float(best[i]), 2)} for i in top]
+
+_engine = None
+_engine_signature = None
+_lock = threading.Lock()
+
+def _signature(conn):
+    candidates = conn.execute("SELECT COUNT(*), MAX(id) FROM candidates").fetchone()
+    jobs = conn.execute("SELECT COUNT(*), MAX(id) FROM jobs").fetchone()
+    return tuple(candidates) + tuple(jobs)
+
+def load_ranking_engine(conn):
+    candidates = conn.execute("SELECT id, name, skills, quiz, experience, summary FROM candidates").fetchall()
+    jobs = conn.execute("SELECT id, title, description, skills_required FROM jobs").fetchall()
+    return RankingEngine(candidates, jobs)
+
+def get_ranking_engine(db_path):
+    # Candidates are insert-only, so the engine is rebuilt only when a row is added
+    global _engine, _engine_signature
+    conn = connect(db_path)
+    try:
+        signature = _signature(conn)
+        with _lock:
+            if _engine is None or _engine_signature != signature:
+                _engine = load_ranking_engine(conn)
+                _engine_signature = signature
+            return _engine
+    finally:
+        conn.close()
@@ -1,13 +1,19 @@
-import pdfplumber
-import spacy
-import sys
-import subprocess
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import hashlib
+import json
+import os
+import threading
+from startup import stage
+from metrics import timed
 
+# spaCy, pdfplumber and scikit-learn are imported on first use rather than at
+# import time, so a worker that never parses a resume never pays for them.
+
+@timed('resume.match')
 def match_resume(resume_text, job_desc):
     if not resume_text.strip() or not job_desc.strip():
         return 0.0
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
     try:
         vectorizer = TfidfVectorizer(stop_words='english')
         tfidf = vectorizer.fit_transform([resume_text, job_desc])
@@ -16,17 +22,37 @@ def match_resume(resume_text, job_desc):
     except ValueError:
         return 0.0
 
-# Ensure the model is available
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading en_core_web_sm since it's missing...")
-    subprocess.check_call([sys.executable, "-m", "spacy", "download", "en_core_web_sm"])
-    nlp = spacy.load("en_core_web_sm")
+# Skill matching only needs the tokenizer, so every trained component is excluded
+NLP_EXCLUDE = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+_nlp = None
+_skill_matcher = None
+_pdfplumber = None
+_load_lock = threading.Lock()
+
+def load_nlp():
+    # A missing model is never downloaded at runtime (install it with
+    # `python -m spacy download en_core_web_sm`); the blank English pipeline
+    # has the same tokenizer, which is all skill matching uses.
+    import spacy
+    try:
+        return spacy.load("en_core_web_sm", exclude=NLP_EXCLUDE)
+    except OSError:
+        print("spaCy model en_core_web_sm is not installed, falling back to the blank English tokenizer")
+        return spacy.blank("en")
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        with _load_lock:
+            if _nlp is None:
+                with stage('spacy model'):
+                    _nlp = load_nlp()
+    return _nlp
 
 SKILLS = ["python", "java", "c++", "sql", "html", "css", "machine learning", "flask"]
 
-ALL_SKILLS = [
+DEFAULT_SKILLS = [
     "python", "java", "c++", "c#", "javascript", "typescript", "ruby", "php", "go", "rust",
     "sql", "nosql", "mongodb", "postgresql", "mysql", "redis",
     "html", "css", "react", "angular", "vue", "node.js", "express", "django", "flask", "fastapi",
@@ -34,10 +60,51 @@ ALL_SKILLS = [
     "aws", "azure", "gcp", "docker", "kubernetes", "ci/cd", "jenkins", "git", "linux"
 ]
 
+def load_skill_catalog(path=None):
+    # SKILL_CATALOG can point at a text file with one skill per line
+    path = path or os.environ.get('SKILL_CATALOG')
+    if not path:
+        return list(DEFAULT_SKILLS)
+    with open(path, 'r', encoding='utf-8') as f:
+        skills = [line.strip().lower() for line in f if line.strip() and not line.startswith('#')]
+    return list(dict.fromkeys(skills))
+
+ALL_SKILLS = load_skill_catalog()
+
+def build_skill_matcher(skills):
+    # One pattern per skill, keyed by the skill itself, matched on lowercase
+    # tokens so multi-token skills like "machine learning" match directly.
+    from spacy.matcher import PhraseMatcher
+    nlp = get_nlp()
+    matcher = PhraseMatcher(nlp.vocab, attr='LOWER')
+    for skill in skills:
+        matcher.add(skill, [nlp.make_doc(skill)])
+    return matcher
+
+def get_skill_matcher():
+    global _skill_matcher
+    if _skill_matcher is None:
+        # Loaded first: the lock is not reentrant
+        get_nlp()
+        with _load_lock:
+            if _skill_matcher is None:
+                with stage('skill matcher'):
+                    _skill_matcher = build_skill_matcher(ALL_SKILLS)
+    return _skill_matcher
+
+def get_pdfplumber():
+    global _pdfplumber
+    if _pdfplumber is None:
+        with stage('pdfplumber'):
+            import pdfplumber
+        _pdfplumber = pdfplumber
+    return _pdfplumber
+
+@timed('pdf.parse')
 def extract_resume_text(path):
     text = ""
     try:
-        with pdfplumber.open(path) as pdf:
+        with get_pdfplumber().open(path) as pdf:
             for page in pdf.pages:
                 page_text = page.extract_text()
                 if page_text:
@@ -47,26 +114,118 @@ def extract_resume_text(path):
         return ""
     return text
 
-def extract_skills(path):
-    text = extract_resume_text(path).lower()
-    if not text:
-        return 0, ""
-    
+def _count_basic_skills(text):
     count = 0
     for skill in SKILLS:
         if skill in text:
             count += 1
-            
-    doc = nlp(text)
-    found_skills = set()
-    for token in doc:
-        if token.text.lower() in ALL_SKILLS:
-            found_skills.add(token.text.lower())
-            
-    for chunk in doc.noun_chunks:
-        chunk_text = chunk.text.lower()
-        for skill in ALL_SKILLS:
-            if skill in chunk_text:
-                found_skills.add(skill)
-                
-    return count, ", ".join(sorted(list(found_skills)))
+    return count
+
+def _skills_in_doc(doc):
+    found_skills = {doc.vocab.strings[match_id] for match_id, start, end in get_skill_matcher()(doc)}
+    return ", ".join(sorted(found_skills))
+
+@timed('skills.extract')
+def skills_from_text(text):
+    text = text.lower()
+    if not text:
+        return 0, ""
+    return _count_basic_skills(text), _skills_in_doc(get_nlp().make_doc(text))
+
+@timed('skills.extract_batch')
+def skills_from_texts(texts, batch_size=64):
+    # Bulk variant of skills_from_text that tokenizes through nlp.pipe
+    texts = [(t or "").lower() for t in texts]
+    results = []
+    for text, doc in zip(texts, get_nlp().pipe(texts, batch_size=batch_size)):
+        if not text:
+            results.append((0, ""))
+        else:
+            results.append((_count_basic_skills(text), _skills_in_doc(doc)))
+    return results
+
+def extract_skills(path):
+    return skills_from_text(extract_resume_text(path))
+
+# Parsed resumes are cached on disk by the SHA-256 of the uploaded bytes, so a
+# re-uploaded resume skips pdfplumber and spaCy entirely. The cache is a bounded
+# LRU: every hit bumps the file's mtime and the oldest entries are evicted.
+RESUME_CACHE_DIR = os.environ.get(
+    'RESUME_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'resumes'))
+RESUME_CACHE_MAX_ENTRIES = int(os.environ.get('RESUME_CACHE_MAX_ENTRIES', 2000))
+
+# Entries record what produced them. Bump EXTRACTOR_VERSION whenever text or
+# skill extraction changes; a different skill catalog is detected by its hash.
+# Entries from another extractor are misses, entries from another catalog
+# keep their text and only have their skills recomputed.
+EXTRACTOR_VERSION = 2
+CATALOG_HASH = hashlib.sha256("\n".join(ALL_SKILLS + ["--"] + SKILLS).encode('utf-8')).hexdigest()[:16]
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _cache_path(digest):
+    return os.path.join(RESUME_CACHE_DIR, f"{digest}.json")
+
+def get_cached_resume(digest):
+    path = _cache_path(digest)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        os.utime(path, None)
+        return entry
+    except (OSError, ValueError):
+        return None
+
+def _evict_resume_cache():
+    try:
+        entries = [e for e in os.scandir(RESUME_CACHE_DIR) if e.name.endswith('.json')]
+    except OSError:
+        return
+    excess = len(entries) - RESUME_CACHE_MAX_ENTRIES
+    if excess <= 0:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for e in entries[:excess]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
+
+def cache_resume(entry):
+    try:
+        os.makedirs(RESUME_CACHE_DIR, exist_ok=True)
+        path = _cache_path(entry['sha256'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Failed to cache resume {entry['sha256']}: {e}")
+        return
+    _evict_resume_cache()
+
+def ingest_resume(path, digest=None):
+    # Single entry point for an uploaded resume: the PDF is parsed once and the
+    # text, skill count and skill list are returned together.
+    if digest is None:
+        digest = hash_file(path)
+    cached = get_cached_resume(digest)
+    if cached is not None and cached.get('extractor') == EXTRACTOR_VERSION:
+        if cached.get('catalog') == CATALOG_HASH:
+            return cached
+        text = cached['text']
+    else:
+        text = extract_resume_text(path)
+    skills_count, skills_str = skills_from_text(text)
+    entry = {'sha256': digest, 'text': text, 'skills_count': skills_count, 'skills': skills_str,
+             'extractor': EXTRACTOR_VERSION, 'catalog': CATALOG_HASH}
+    # Unreadable PDFs are not cached so a transient failure is retried
+    if text:
+        cache_resume(entry)
+    return entry
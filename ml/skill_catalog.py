@@ -0,0 +1,93 @@
+import threading
+from database.db import connect
+
+# Process-wide view of the jobs table for skill-gap questions: every required
+# skill gets an integer id, each job maps to its skill ids (and a bitmap of
+# them) and each skill maps back to the jobs requiring it. Gaps are exact set
+# differences, so "java" is no longer satisfied by "javascript".
+
+_catalog = None
+_catalog_signature = None
+_lock = threading.Lock()
+
+def normalize_skill(skill):
+    return " ".join(skill.lower().split())
+
+def parse_skills(skills_str):
+    # "Python, SQL ,machine  learning" -> ['python', 'sql', 'machine learning'], order kept
+    seen = []
+    for s in (skills_str or "").split(","):
+        s = normalize_skill(s)
+        if s and s not in seen:
+            seen.append(s)
+    return seen
+
+class SkillCatalog:
+    def __init__(self, jobs):
+        # jobs: rows of (id, skills_required)
+        self.skill_ids = {}
+        self.skill_names = []
+        self.job_skills = {}
+        self.job_bitmaps = {}
+        self.skill_jobs = {}
+        for job_id, skills_required in jobs:
+            ids = tuple(self._intern(s) for s in parse_skills(skills_required))
+            self.job_skills[job_id] = ids
+            self.job_bitmaps[job_id] = sum(1 << skill_id for skill_id in set(ids))
+            for skill_id in ids:
+                self.skill_jobs.setdefault(skill_id, set()).add(job_id)
+        # Most demanded first, for prompts and the dashboard
+        self.required = sorted(self.skill_jobs, key=lambda s: (-len(self.skill_jobs[s]), self.skill_names[s]))
+
+    def _intern(self, name):
+        if name not in self.skill_ids:
+            self.skill_ids[name] = len(self.skill_names)
+            self.skill_names.append(name)
+        return self.skill_ids[name]
+
+    def skill_set(self, skills_str):
+        # Skills the catalog has never seen cannot close any gap, so they are dropped
+        return {self.skill_ids[s] for s in parse_skills(skills_str) if s in self.skill_ids}
+
+    def bitmap(self, skills_str):
+        return sum(1 << s for s in self.skill_set(skills_str))
+
+    def coverage(self, job_id, bitmap):
+        # Share of the job's skills present in the bitmap, 0 for jobs listing none
+        required = self.job_bitmaps[job_id]
+        return (required & bitmap).bit_count() / required.bit_count() if required else 0.0
+
+    def missing_skills(self, candidate_skills):
+        have = self.skill_set(candidate_skills)
+        return [self.skill_names[s] for s in self.required if s not in have]
+
+    def job_gap(self, job_id, candidate_skills):
+        have = self.skill_set(candidate_skills)
+        return [self.skill_names[s] for s in self.job_skills[job_id] if s not in have]
+
+def _jobs_signature(conn):
+    # Jobs are only ever added, so the highest id identifies the table's state.
+    # Unlike COUNT(*) it is a single index lookup however many jobs there are.
+    return conn.execute("SELECT MAX(id) FROM jobs").fetchone()
+
+def get_skill_catalog(db_path):
+    # Rebuilt after invalidate_skill_catalog() or when another worker has added a job
+    global _catalog, _catalog_signature
+    conn = connect(db_path)
+    try:
+        signature = _jobs_signature(conn)
+        if _catalog is not None and _catalog_signature == signature:
+            return _catalog
+        with _lock:
+            if _catalog is None or _catalog_signature != signature:
+                _catalog = SkillCatalog(conn.execute("SELECT id, skills_required FROM jobs ORDER BY id").fetchall())
+                _catalog_signature = signature
+            return _catalog
+    finally:
+        conn.close()
+
+def invalidate_skill_catalog():
+    global _catalog, _catalog_signature
+    with _lock:
+        _catalog = None
+        _catalog_signature = None
@@ -1,21 +1,231 @@
-import pandas as pd
 import os
-from sklearn.ensemble import RandomForestClassifier
-import joblib
+import sys
+import json
+import time
+import argparse
+import itertools
+import numpy as np
 
-# Ensure we read the file relative to the script's directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
-data_path = os.path.join(current_dir, "data.csv")
-data = pd.read_csv(data_path)
+BASE_DIR = os.path.dirname(current_dir)
+# Runs as a script as well as with -m
+sys.path.insert(0, BASE_DIR)
+from ml.predictor import Forest, FEATURES, FOREST_PATH, PICKLE_PATH, export_forest, save_forest, save_pickle
+from ml.generate_data import DATA_PATH, generate
+from database.db import connect, migrate
 
-X = data[['experience', 'skills', 'quiz']]
-y = data['selected']
+# Trains the selection model from the candidates table (or the synthetic
+# data), picks its size with a small hyperparameter search and writes a
+# versioned artifact under models/<version>/. Unless --no-promote is given the
+# forest is also installed as model.forest.npz, which the app reloads itself.
 
-model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
-model.fit(X, y)
+DB_PATH = os.path.join(BASE_DIR, 'database', 'candidates.db')
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
 
-# Save the model relative to the script's directory
-model_path = os.path.join(current_dir, "..", "model.pkl")
-joblib.dump(model, model_path)
+# Admin decisions only: approve (selected = 1) is the positive class and
+# reject (selected = 2) the negative one. Rows the model scored but nobody
+# reviewed would teach the model its own output.
+LABELED_WHERE = "reviewed_at IS NOT NULL AND selected IN (1, 2)"
 
-print(f"RandomForestClassifier model trained on {len(data)} samples and saved to {model_path}")
\ No newline at end of file
+# With fewer reviewed candidates than this, --source auto uses data.csv
+MIN_LABELED_ROWS = 200
+
+SEARCH_SPACE = {
+    'n_estimators': [25, 50, 100],
+    'max_depth': [6, 8, 10, 12],
+    'min_samples_leaf': [1, 5, 20],
+}
+
+# Rows timed for the per-row latency figures
+LATENCY_ROWS = 100_000
+
+def load_labeled(db_path, chunk_size=50_000):
+    # Streams reviewed candidates in id order into preallocated arrays. Ids
+    # above the snapshot taken first are left for the next run.
+    conn = connect(db_path)
+    try:
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM candidates").fetchone()[0]
+        n = conn.execute(f"SELECT COUNT(*) FROM candidates WHERE id <= ? AND {LABELED_WHERE}", (max_id,)).fetchone()[0]
+        X = np.empty((n, len(FEATURES)), dtype=np.float32)
+        y = np.empty(n, dtype=np.int8)
+        filled = 0
+        last_id = 0
+        while filled < n:
+            rows = conn.execute(f"SELECT id, experience, skills, quiz, selected FROM candidates "
+                                f"WHERE id > ? AND id <= ? AND {LABELED_WHERE} ORDER BY id LIMIT ?",
+                                (last_id, max_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            rows = rows[:n - filled]
+            X[filled:filled + len(rows)] = [[r[1] or 0, r[2] or 0, r[3] or 0] for r in rows]
+            y[filled:filled + len(rows)] = [1 if r[4] == 1 else 0 for r in rows]
+            filled += len(rows)
+        return X[:filled], y[:filled]
+    finally:
+        conn.close()
+
+def load_csv(path, chunk_size=500_000):
+    import pandas as pd
+    parts = [(chunk[FEATURES].to_numpy(np.float32), chunk['selected'].to_numpy(np.int8))
+             for chunk in pd.read_csv(path, usecols=FEATURES + ['selected'], chunksize=chunk_size)]
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+def load_data(args):
+    # Returns (X, y, description of the source)
+    source = args.source
+    if source in ('auto', 'db'):
+        migrate(args.db)
+        X, y = load_labeled(args.db, args.chunk_size)
+        if source == 'db' or len(y) >= MIN_LABELED_ROWS:
+            return X, y, f"{len(y)} reviewed candidates in {args.db}"
+        print(f"Only {len(y)} reviewed candidates in {args.db}, training on {args.csv} instead")
+        source = 'csv'
+    if source == 'csv':
+        X, y = load_csv(args.csv)
+        return X, y, f"{len(y)} rows of {args.csv}"
+    X, y = generate(args.rows, args.seed)
+    return X, y, f"{len(y)} synthetic rows"
+
+def split(X, y, holdout, seed):
+    order = np.random.RandomState(seed).permutation(len(y))
+    cut = len(y) - max(int(len(y) * holdout), 1)
+    return X[order[:cut]], y[order[:cut]], X[order[cut:]], y[order[cut:]]
+
+def fit(X, y, params, jobs, seed):
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(random_state=seed, n_jobs=jobs, **params)
+    model.fit(X, y)
+    return model
+
+def evaluate(forest, X, y):
+    # Accuracy and batch latency of the flattened forest, which is what the
+    # app serves, rather than of the scikit-learn model
+    X, y = X[:LATENCY_ROWS], y[:LATENCY_ROWS]
+    start = time.perf_counter()
+    predictions = forest.predict(X)
+    seconds = time.perf_counter() - start
+    return float((predictions == y).mean()), seconds / len(y) * 1e6
+
+def single_row_latency(forest, X, calls=1000):
+    start = time.perf_counter()
+    for row in X[:calls]:
+        forest.predict(row[None, :])
+    return (time.perf_counter() - start) / min(calls, len(X)) * 1e6
+
+def search(X, y, X_val, y_val, args):
+    # Tries at most --trials random points of SEARCH_SPACE on a sample of at
+    # most --search-rows rows, stopping early after --max-search-seconds.
+    # Among trials within --tolerance of the best accuracy, the one with the
+    # fewest nodes wins: smaller forests load faster and predict faster.
+    rng = np.random.RandomState(args.seed)
+    grid = list(itertools.product(*SEARCH_SPACE.values()))
+    points = [dict(zip(SEARCH_SPACE, grid[i])) for i in rng.permutation(len(grid))[:args.trials]]
+    if len(y) > args.search_rows:
+        sample = rng.choice(len(y), args.search_rows, replace=False)
+        X, y = X[sample], y[sample]
+    trials = []
+    started = time.perf_counter()
+    for params in points:
+        if trials and time.perf_counter() - started > args.max_search_seconds:
+            print(f"Search stopped after {len(trials)} trials (--max-search-seconds)")
+            break
+        fit_start = time.perf_counter()
+        forest = Forest(export_forest(fit(X, y, params, args.jobs, args.seed)))
+        fit_seconds = time.perf_counter() - fit_start
+        accuracy, latency = evaluate(forest, X_val, y_val)
+        trials.append({'params': params, 'accuracy': accuracy, 'nodes': len(forest.feature),
+                       'fit_seconds': fit_seconds, 'us_per_row': latency})
+        print(f"  {params}: accuracy {accuracy:.4f}, {len(forest.feature)} nodes, "
+              f"fit {fit_seconds:.1f}s, {latency:.2f} us/row")
+    best = max(t['accuracy'] for t in trials)
+    chosen = min((t for t in trials if t['accuracy'] >= best - args.tolerance),
+                 key=lambda t: (t['nodes'], t['us_per_row']))
+    return chosen, trials
+
+def save_artifact(model, arrays, metadata, models_dir):
+    # models/<version>/ holds the scikit-learn model (uncompressed joblib, so
+    # joblib.load(path, mmap_mode='r') maps its arrays instead of copying
+    # them), the flattened forest and what produced them
+    import joblib
+    path = os.path.join(models_dir, str(arrays['version']))
+    os.makedirs(path, exist_ok=True)
+    joblib.dump(model, os.path.join(path, 'model.joblib'))
+    save_forest(arrays, os.path.join(path, 'forest.npz'))
+    with open(os.path.join(path, 'metadata.json'), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the selection model")
+    parser.add_argument('--source', choices=['auto', 'db', 'csv', 'synthetic'], default='auto',
+                        help="auto: reviewed candidates if there are enough, else data.csv")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--csv', default=DATA_PATH)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="rows for --source synthetic")
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--holdout', type=float, default=0.2)
+    parser.add_argument('--trials', type=int, default=8, help="hyperparameter settings tried (0 skips the search)")
+    parser.add_argument('--search-rows', type=int, default=200_000)
+    parser.add_argument('--max-search-seconds', type=float, default=300)
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help="accuracy a smaller model may give up against the most accurate one")
+    parser.add_argument('--jobs', type=int, default=-1, help="n_jobs for fitting")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--no-promote', action='store_true', help="do not install the model for the app")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    X, y, source = load_data(args)
+    load_seconds = time.perf_counter() - start
+    if len(np.unique(y)) < 2:
+        print(f"Cannot train on {source}: it has only one class")
+        return 1
+    X_train, y_train, X_val, y_val = split(X, y, args.holdout, args.seed)
+    print(f"Loaded {source} in {load_seconds:.1f}s")
+
+    params = {'n_estimators': 100, 'max_depth': 10, 'min_samples_leaf': 1}
+    trials = []
+    if args.trials > 0:
+        print(f"Searching {args.trials} of {len(list(itertools.product(*SEARCH_SPACE.values())))} settings:")
+        chosen, trials = search(X_train, y_train, X_val, y_val, args)
+        params = chosen['params']
+    print(f"Training {params} on {len(y_train)} rows")
+
+    start = time.perf_counter()
+    model = fit(X_train, y_train, params, args.jobs, args.seed)
+    train_seconds = time.perf_counter() - start
+    arrays = export_forest(model)
+    forest = Forest(arrays)
+    accuracy, batch_latency = evaluate(forest, X_val, y_val)
+    row_latency = single_row_latency(forest, X_val)
+
+    metadata = {
+        'version': str(arrays['version']),
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': source,
+        'features': FEATURES,
+        'params': params,
+        'train_rows': len(y_train),
+        'holdout_rows': len(y_val),
+        'holdout_accuracy': accuracy,
+        'nodes': len(forest.feature),
+        'train_seconds': train_seconds,
+        'batch_us_per_row': batch_latency,
+        'single_row_us': row_latency,
+        'search': trials,
+    }
+    path = save_artifact(model, arrays, metadata, args.models_dir)
+    print(f"Model {metadata['version']}: holdout accuracy {accuracy:.4f}, {metadata['nodes']} nodes")
+    print(f"Train time {train_seconds:.1f}s; inference {batch_latency:.3f} us/row batched, {row_latency:.1f} us for a single row")
+    print(f"Saved to {path}")
+
+    if not args.no_promote:
+        save_pickle(model, PICKLE_PATH)
+        save_forest(arrays, FOREST_PATH)
+        print(f"Installed as {FOREST_PATH}; running apps pick it up within seconds")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
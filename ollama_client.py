@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import span, observe
+
+OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
+OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'gemma3:4b')
+
+logger = logging.getLogger(__name__)
+
+class OllamaError(Exception):
+    pass
+
+class OllamaTimeout(OllamaError):
+    pass
+
+class OllamaUnavailable(OllamaError):
+    pass
+
+class CircuitBreaker:
+    # After `failure_threshold` consecutive failures the circuit opens and calls
+    # fail instantly for `reset_timeout` seconds. Then a single trial call is let
+    # through: success closes the circuit, failure opens it again.
+    def __init__(self, failure_threshold=3, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        # The trial call ended without telling anything about the server (the
+        # client went away first), so the next call may try again
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class OllamaClient:
+    def __init__(self, base_url=OLLAMA_URL, model=OLLAMA_MODEL, pool_size=10, connect_timeout=2,
+                 retries=1, breaker=None, cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        # One keep-alive session shared by every call site
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'successes': 0, 'errors': 0, 'timeouts': 0, 'retries': 0, 'short_circuited': 0,
+                         'latency_seconds_total': 0.0, 'latency_seconds_max': 0.0,
+                         'streams': 0, 'streams_cancelled': 0, 'ttft_seconds_total': 0.0, 'ttft_seconds_max': 0.0}
+
+    def _count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def _observe(self, elapsed):
+        with self.lock:
+            self.counters['latency_seconds_total'] += elapsed
+            self.counters['latency_seconds_max'] = max(self.counters['latency_seconds_max'], elapsed)
+
+    def _post(self, payload, timeout, stream=False):
+        # Only connection failures and 5xx responses are retried: retrying a read
+        # timeout would make the caller wait out the full timeout again.
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise OllamaUnavailable('Ollama circuit is open')
+        for attempt in range(self.retries + 1):
+            self._count('requests')
+            try:
+                r = self.session.post(f'{self.base_url}/api/generate', json=payload,
+                                      timeout=(self.connect_timeout, timeout), stream=stream)
+                if r.status_code >= 500:
+                    r.close()
+                    raise OllamaUnavailable(f'Ollama returned HTTP {r.status_code}')
+                r.raise_for_status()
+                return r
+            except requests.exceptions.ReadTimeout as e:
+                self._count('errors')
+                self._count('timeouts')
+                self.breaker.record_failure()
+                raise OllamaTimeout(str(e)) from e
+            except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout, OllamaUnavailable) as e:
+                self._count('errors')
+                if attempt >= self.retries:
+                    self.breaker.record_failure()
+                    if isinstance(e, OllamaUnavailable):
+                        raise
+                    raise OllamaUnavailable(str(e)) from e
+                self._count('retries')
+                time.sleep(0.2 * (2 ** attempt))
+            except requests.exceptions.RequestException as e:
+                self._count('errors')
+                self.breaker.record_failure()
+                raise OllamaError(str(e)) from e
+
+    def generate(self, prompt, timeout=30, model=None, cache_kind=None, cacheable=None):
+        # With cache_kind set, a cached response for the same prompt is returned
+        # without calling Ollama; `cacheable` can reject responses not worth keeping.
+        with span(f"llm.{cache_kind or 'generate'}"):
+            return self._generate(prompt, timeout, model, cache_kind, cacheable)
+
+    def _generate(self, prompt, timeout, model, cache_kind, cacheable):
+        model = model or self.model
+        use_cache = self.cache is not None and cache_kind is not None
+        if use_cache:
+            cached = self.cache.get(cache_kind, model, prompt)
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        r = self._post({"model": model, "prompt": prompt, "stream": False}, timeout)
+        try:
+            json_data = r.json()
+        except ValueError as e:
+            self._count('errors')
+            self.breaker.record_failure()
+            raise OllamaError('Invalid JSON from Ollama') from e
+        if 'response' not in json_data:
+            # The server is up, it just answered something unexpected
+            self.breaker.record_success()
+            self._count('errors')
+            raise OllamaError('Unexpected response from AI')
+        self.breaker.record_success()
+        self._count('successes')
+        self._observe(time.perf_counter() - start)
+        response = json_data['response']
+        if use_cache and (cacheable is None or cacheable(response)):
+            self.cache.put(cache_kind, model, prompt, response)
+        return response
+
+    def stream(self, prompt, timeout=120, model=None, cache_kind=None):
+        # Yields tokens as Ollama produces them. `timeout` applies between chunks.
+        # Closing the generator (the client went away) closes the upstream
+        # connection, which makes Ollama stop generating.
+        model = model or self.model
+        use_cache = self.cache is not None and cache_kind is not None
+        if use_cache:
+            cached = self.cache.get(cache_kind, model, prompt)
+            if cached is not None:
+                yield cached
+                return
+        start = time.perf_counter()
+        r = self._post({"model": model, "prompt": prompt, "stream": True}, timeout, stream=True)
+        first_token = None
+        tokens = []
+        try:
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if 'error' in chunk:
+                    raise OllamaError(chunk['error'])
+                token = chunk.get('response', '')
+                if token:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                        observe(f"llm.{cache_kind or 'stream'}.first_token", first_token)
+                        with self.lock:
+                            self.counters['ttft_seconds_total'] += first_token
+                            self.counters['ttft_seconds_max'] = max(self.counters['ttft_seconds_max'], first_token)
+                    tokens.append(token)
+                    yield token
+                if chunk.get('done'):
+                    break
+        except GeneratorExit:
+            self._count('streams_cancelled')
+            logger.info("Ollama stream cancelled by client after %.2fs", time.perf_counter() - start)
+            # Tokens arriving shows the server works; otherwise nothing was learned
+            if tokens:
+                self.breaker.record_success()
+            else:
+                self.breaker.release_trial()
+            raise
+        except OllamaError:
+            # An error chunk from Ollama
+            self._count('errors')
+            self.breaker.record_failure()
+            raise
+        except requests.exceptions.RequestException as e:
+            self._count('errors')
+            self.breaker.record_failure()
+            if isinstance(e, requests.exceptions.ConnectionError) and 'timed out' in str(e).lower():
+                raise OllamaTimeout(str(e)) from e
+            raise OllamaUnavailable(str(e)) from e
+        except ValueError as e:
+            self._count('errors')
+            self.breaker.record_failure()
+            raise OllamaError('Invalid stream chunk from Ollama') from e
+        finally:
+            r.close()
+        total = time.perf_counter() - start
+        self.breaker.record_success()
+        self._count('successes')
+        self._count('streams')
+        self._observe(total)
+        observe(f"llm.{cache_kind or 'stream'}.stream", total)
+        logger.info("Ollama stream: first token %.2fs, total %.2fs",
+                    first_token if first_token is not None else total, total)
+        # Only complete generations are cached, never ones cut short by the client
+        if use_cache and tokens:
+            self.cache.put(cache_kind, model, prompt, ''.join(tokens))
+
+    def is_available(self):
+        return self.breaker.state != 'open'
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        successes = stats['successes']
+        stats['latency_seconds_avg'] = round(stats['latency_seconds_total'] / successes, 3) if successes else 0.0
+        stats['ttft_seconds_avg'] = round(stats['ttft_seconds_total'] / stats['streams'], 3) if stats['streams'] else 0.0
+        stats['circuit'] = self.breaker.state
+        return stats
@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from database.db import connect
+
+# Quizzes are assembled from a bank of pre-generated questions per skill and
+# experience bucket, so no LLM call sits on the quiz's critical path. A
+# background filler tops up any (skill, bucket) that drops below LOW_WATERMARK.
+
+EXP_BUCKETS = [('junior', 0, 2), ('mid', 3, 6), ('senior', 7, None)]
+
+LOW_WATERMARK = int(os.environ.get('QUIZ_BANK_LOW_WATERMARK', 10))
+HIGH_WATERMARK = int(os.environ.get('QUIZ_BANK_HIGH_WATERMARK', 25))
+
+def spread(skills, available, n):
+    # Up to n questions spread evenly over skills, visited in random order;
+    # available: {skill: questions in the bank}
+    skills = random.sample(skills, len(skills))
+    wanted = {}
+    while n and skills:
+        for skill in list(skills):
+            if not n:
+                break
+            if wanted.get(skill, 0) < available[skill]:
+                wanted[skill] = wanted.get(skill, 0) + 1
+                n -= 1
+            else:
+                skills.remove(skill)
+    return wanted
+
+def experience_bucket(years):
+    for name, low, high in EXP_BUCKETS:
+        if high is None or years <= high:
+            return name
+    return EXP_BUCKETS[-1][0]
+
+def parse_questions(response_text):
+    # Try to extract just the JSON part
+    match = re.search(r'\[.*\]', response_text, re.DOTALL)
+    if match:
+        return json.loads(match.group())
+    else:
+        return json.loads(response_text)
+
+def valid_question(q):
+    return (isinstance(q, dict) and isinstance(q.get('question'), str) and isinstance(q.get('options'), list)
+            and len(q['options']) >= 2 and q.get('answer') in q['options'])
+
+class QuestionBank:
+    def __init__(self, db_path, ollama, skills):
+        self.db_path = db_path
+        self.ollama = ollama
+        self.skills = list(skills)
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self.filler = None
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def counts(self, conn=None):
+        own = conn is None
+        conn = conn or self._connect()
+        rows = conn.execute("SELECT skill, exp_bucket, COUNT(*) FROM quiz_bank GROUP BY skill, exp_bucket").fetchall()
+        if own:
+            conn.close()
+        return {(skill, bucket): n for skill, bucket, n in rows}
+
+    def assemble_quiz(self, experience, skills_str, n=5):
+        # Most questions come from the candidate's own skills, the rest from
+        # general ones. Returns None, so the quiz is generated for the
+        # candidate instead, when the bank cannot supply that for this bucket yet.
+        bucket = experience_bucket(experience)
+        candidate_skills = {s.strip().lower() for s in (skills_str or "").split(",") if s.strip()}
+        conn = self._connect()
+        try:
+            available = dict(conn.execute("SELECT skill, COUNT(*) FROM quiz_bank WHERE exp_bucket=? GROUP BY skill",
+                                          (bucket,)).fetchall())
+            own = [s for s in available if s in candidate_skills]
+            if sum(available[s] for s in own) < n // 2 + 1:
+                return None
+            wanted = spread(own, available, n)
+            wanted.update(spread([s for s in available if s not in candidate_skills], available, n - sum(wanted.values())))
+            if sum(wanted.values()) < n:
+                return None
+            questions = []
+            for skill, k in wanted.items():
+                rows = conn.execute("SELECT question, options, answer FROM quiz_bank WHERE exp_bucket=? AND skill=? ORDER BY RANDOM() LIMIT ?",
+                                    (bucket, skill, k)).fetchall()
+                questions.extend({'question': q, 'options': json.loads(o), 'answer': a} for q, o, a in rows)
+        finally:
+            conn.close()
+        random.shuffle(questions)
+        return questions
+
+    def generate_for(self, skill, bucket, n=5):
+        prompt = (f"Generate exactly {n} multiple choice questions for a technical interview about {skill}, "
+                  f"pitched at a {bucket} level candidate. Output ONLY valid JSON containing an array of objects. "
+                  "Each object must have 'question' (string), 'options' (array of 4 strings), and 'answer' "
+                  "(the exact string from options that is correct).")
+        questions = [q for q in parse_questions(self.ollama.generate(prompt, timeout=60).strip()) if valid_question(q)]
+        conn = self._connect()
+        now = time.time()
+        conn.executemany("INSERT OR IGNORE INTO quiz_bank (skill, exp_bucket, question, options, answer, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         [(skill, bucket, q['question'], json.dumps(q['options']), q['answer'], now) for q in questions])
+        conn.commit()
+        conn.close()
+        return len(questions)
+
+    def _acquire_lease(self, seconds):
+        conn = self._connect()
+        try:
+            now = time.time()
+            conn.execute("INSERT OR IGNORE INTO quiz_bank_lease (id, owner, expires_at) VALUES (1, NULL, 0)")
+            cur = conn.execute("UPDATE quiz_bank_lease SET owner=?, expires_at=? WHERE id=1 AND (owner=? OR expires_at < ?)",
+                               (self.owner, now + seconds, self.owner, now))
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def fill(self, max_batches=None, lease_seconds=None):
+        # Tops up every (skill, bucket) below the low watermark to the high one.
+        # With lease_seconds the fill lease is renewed after every batch, and
+        # filling stops as soon as another process holds it.
+        counts = self.counts()
+        batches = 0
+        for skill in self.skills:
+            for bucket, _, _ in EXP_BUCKETS:
+                if counts.get((skill, bucket), 0) >= LOW_WATERMARK:
+                    continue
+                have = counts.get((skill, bucket), 0)
+                attempts = 0
+                while have < HIGH_WATERMARK and attempts < 10:
+                    if not self.ollama.is_available():
+                        return batches
+                    attempts += 1
+                    batches += 1
+                    try:
+                        self.generate_for(skill, bucket)
+                    except Exception as e:
+                        print(f"Quiz bank fill error ({skill}, {bucket}):", e)
+                    have = self.counts().get((skill, bucket), 0)
+                    if max_batches is not None and batches >= max_batches:
+                        return batches
+                    if lease_seconds is not None and not self._acquire_lease(lease_seconds):
+                        return batches
+        return batches
+
+    def _fill_forever(self, interval):
+        while True:
+            try:
+                if self._acquire_lease(interval * 2):
+                    self.fill(lease_seconds=interval * 2)
+            except Exception as e:
+                print("Quiz bank filler error:", e)
+            time.sleep(interval)
+
+    def start_filler(self, interval=60):
+        if self.filler is None or not self.filler.is_alive():
+            # A forked worker must not share its parent's lease owner
+            self.owner = f"{os.getpid()}-{id(self)}"
+            self.filler = threading.Thread(target=self._fill_forever, args=(interval,), name='quiz-bank-filler', daemon=True)
+            self.filler.start()
+
+    def stats(self):
+        counts = self.counts()
+        buckets = {}
+        for (skill, bucket), n in counts.items():
+            buckets.setdefault(bucket, {})[skill] = n
+        below = sum(1 for skill in self.skills for b, _, _ in EXP_BUCKETS if counts.get((skill, b), 0) < LOW_WATERMARK)
+        return {'questions': sum(counts.values()), 'buckets_below_watermark': below, 'by_bucket': buckets}
+
+if __name__ == '__main__':
+    import argparse
+    from ollama_client import OllamaClient
+    from ml.resume_parser import ALL_SKILLS
+    from database.db import migrate
+
+    parser = argparse.ArgumentParser(description="Fill the quiz question bank up to its watermarks")
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'candidates.db'))
+    parser.add_argument('--max-batches', type=int, default=None)
+    args = parser.parse_args()
+
+    migrate(args.db)
+    bank = QuestionBank(args.db, OllamaClient(), ALL_SKILLS)
+    print(f"Generated {bank.fill(args.max_batches)} batches; {bank.stats()['buckets_below_watermark']} buckets still below watermark")
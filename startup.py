@@ -0,0 +1,37 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Where a worker's startup time goes: app.py records how long its imports and
+# setup took, and every lazily loaded dependency (spaCy, pdfplumber,
+# scikit-learn, matplotlib, the model, the indexes) records its first load.
+# Shown at /admin/startup and printed by preload().
+
+STARTED_AT = time.perf_counter()
+
+_stages = []
+_lock = threading.Lock()
+
+def record(name, seconds):
+    with _lock:
+        _stages.append((name, seconds))
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+def report():
+    with _lock:
+        stages = list(_stages)
+    return {
+        'uptime_seconds': round(time.perf_counter() - STARTED_AT, 3),
+        'stages': [{'name': name, 'ms': round(seconds * 1000, 1)} for name, seconds in stages],
+    }
+
+def print_report():
+    for item in report()['stages']:
+        print(f"  {item['name']:<28} {item['ms']:>9.1f} ms")
@@ -1,2 +1,50 @@
 // Main script file
 console.log('Script loaded successfully.');
+
+// POSTs `body` as JSON to a Server-Sent Events endpoint and calls onToken for
+// every streamed token. Resolves when the stream ends, rejects on errors.
+function streamEvents(url, body, onToken) {
+    return fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body || {})
+    }).then(response => {
+        if (!response.ok || !response.body) {
+            return response.json().then(data => { throw new Error(data.error || 'Request failed'); });
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        function handleEvent(raw) {
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            const payload = data ? JSON.parse(data) : {};
+            if (event === 'token') onToken(payload.token);
+            else if (event === 'error') throw new Error(payload.error);
+            return event === 'done';
+        }
+
+        function read() {
+            return reader.read().then(({ done, value }) => {
+                if (done) return;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const raw = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    if (handleEvent(raw)) {
+                        reader.cancel();
+                        return;
+                    }
+                }
+                return read();
+            });
+        }
+        return read();
+    });
+}
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from database.db import connect
+
+# Background tasks (LLM calls from /apply) run on a bounded thread pool. Their
+# state lives in the tasks table, so pages can poll for readiness from any
+# worker and tasks interrupted by a restart are picked up again on startup.
+# A claimed task carries its process's lease, renewed in the background, so
+# recovery in one worker never takes over tasks another live worker runs.
+
+FINISHED = ('done', 'failed')
+
+LEASE_SECONDS = 60
+
+class TaskQueue:
+    def __init__(self, db_path, max_workers=4):
+        self.db_path = db_path
+        self.handlers = {}
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.pid = None
+        self.executor = None
+        self.owner = None
+        # Ids sitting in or running on this process's pool, so a sweep never
+        # submits the same task to it twice
+        self.submitted = set()
+
+    def _executor(self):
+        # Threads do not survive a fork, so the pool and the heartbeat are
+        # started on first use in each process, never inherited from a
+        # preloading master
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='task')
+                    self.submitted = set()
+                    self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+                    threading.Thread(target=self._renew_leases, name='task-heartbeat', daemon=True).start()
+                    self.pid = os.getpid()
+        return self.executor
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def submit(self, kind, *args):
+        task_id = uuid.uuid4().hex
+        conn = self._connect()
+        conn.execute("INSERT INTO tasks (id, kind, payload, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                     (task_id, kind, json.dumps(args), time.time()))
+        conn.commit()
+        conn.close()
+        self._enqueue(task_id)
+        return task_id
+
+    def _enqueue(self, task_id):
+        executor = self._executor()
+        with self.lock:
+            if task_id in self.submitted:
+                return False
+            self.submitted.add(task_id)
+        executor.submit(self._run, task_id)
+        return True
+
+    def _run(self, task_id):
+        conn = self._connect()
+        try:
+            # Claim the task so a concurrent recover() cannot run it twice
+            now = time.time()
+            cur = conn.execute("UPDATE tasks SET status='running', started_at=?, owner=?, lease_until=? WHERE id=? AND status='queued'",
+                               (now, self.owner, now + LEASE_SECONDS, task_id))
+            conn.commit()
+            if cur.rowcount == 0:
+                return
+            kind, payload = conn.execute("SELECT kind, payload FROM tasks WHERE id=?", (task_id,)).fetchone()
+            try:
+                result = self.handlers[kind](*json.loads(payload))
+                conn.execute("UPDATE tasks SET status='done', result=?, finished_at=? WHERE id=?",
+                             (json.dumps(result), time.time(), task_id))
+            except Exception as e:
+                print(f"Task error ({kind}):", e)
+                conn.execute("UPDATE tasks SET status='failed', error=?, finished_at=? WHERE id=?",
+                             (str(e), time.time(), task_id))
+            conn.commit()
+        finally:
+            conn.close()
+            with self.lock:
+                self.submitted.discard(task_id)
+
+    def _renew_leases(self):
+        # Also sweeps up after dead workers: their running tasks once the lease
+        # lapses, and tasks that sat queued in their pool for a whole lease
+        while True:
+            time.sleep(LEASE_SECONDS / 3)
+            try:
+                conn = self._connect()
+                conn.execute("UPDATE tasks SET lease_until=? WHERE owner=? AND status='running'",
+                             (time.time() + LEASE_SECONDS, self.owner))
+                conn.commit()
+                conn.close()
+                self._requeue(time.time() - LEASE_SECONDS)
+            except Exception as e:
+                print("Task lease renewal error:", e)
+
+    def _requeue(self, queued_before):
+        # Claiming is atomic, so a task that also sits in a live worker's pool
+        # still runs once. Returns the number of tasks newly submitted here.
+        conn = self._connect()
+        conn.execute("UPDATE tasks SET status='queued', started_at=NULL, owner=NULL, lease_until=NULL WHERE status='running' AND COALESCE(lease_until, 0) < ?",
+                     (time.time(),))
+        conn.commit()
+        pending = [row[0] for row in conn.execute("SELECT id FROM tasks WHERE status='queued' AND created_at < ? ORDER BY created_at",
+                                                  (queued_before,))]
+        conn.close()
+        return sum(self._enqueue(task_id) for task_id in pending)
+
+    def recover(self):
+        # On startup: running tasks whose owner stopped renewing its lease (it
+        # died or restarted) and every queued task. Starts this process's pool
+        # and heartbeat, which keeps sweeping from then on.
+        self._executor()
+        self.purge()
+        return self._requeue(time.time())
+
+    def get(self, task_ids):
+        task_ids = [t for t in task_ids if t]
+        if not task_ids:
+            return {}
+        conn = self._connect()
+        placeholders = ','.join(['?'] * len(task_ids))
+        rows = conn.execute(f"SELECT id, kind, status, result, error, created_at, started_at, finished_at FROM tasks WHERE id IN ({placeholders})",
+                            task_ids).fetchall()
+        conn.close()
+        tasks = {}
+        for row in rows:
+            task = {'id': row[0], 'kind': row[1], 'status': row[2], 'error': row[4],
+                    'result': json.loads(row[3]) if row[3] is not None else None}
+            # Per-task timing: time spent waiting for a worker and time spent running
+            if row[6] is not None:
+                task['queued_seconds'] = round(row[6] - row[5], 3)
+            if row[7] is not None and row[6] is not None:
+                task['run_seconds'] = round(row[7] - row[6], 3)
+            tasks[row[0]] = task
+        return tasks
+
+    def wait(self, task_ids, timeout=30, interval=0.25):
+        deadline = time.time() + timeout
+        while True:
+            tasks = self.get(task_ids)
+            if all(t['status'] in FINISHED for t in tasks.values()) or time.time() >= deadline:
+                return tasks
+            time.sleep(interval)
+
+    def purge(self, older_than_seconds=7 * 24 * 3600):
+        conn = self._connect()
+        conn.execute("DELETE FROM tasks WHERE status IN ('done', 'failed') AND finished_at < ?",
+                     (time.time() - older_than_seconds,))
+        conn.commit()
+        conn.close()
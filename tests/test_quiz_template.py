@@ -0,0 +1,31 @@
+import os
+import re
+import shutil
+import subprocess
+import pytest
+from flask import Flask, render_template
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def render_quiz(**context):
+    # A bare app over the real templates, so rendering needs no models or database
+    app = Flask(__name__, template_folder=os.path.join(BASE_DIR, 'templates'),
+                static_folder=os.path.join(BASE_DIR, 'static'))
+    with app.test_request_context('/quiz'):
+        return render_template('quiz.html', **context)
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="needs node to parse the page script")
+def test_pending_page_script_parses(tmp_path):
+    html = render_quiz(questions=[], pending=True)
+    scripts = re.findall(r'<script>(.*?)</script>', html, re.S)
+    assert scripts
+    for n, script in enumerate(scripts):
+        path = tmp_path / f"script{n}.js"
+        path.write_text(script)
+        result = subprocess.run(['node', '--check', str(path)], capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
+def test_pending_page_polls_status():
+    html = render_quiz(questions=[], pending=True)
+    assert "fetch('/api/apply/status')" in html
+    assert '<form action="/quiz"' not in html